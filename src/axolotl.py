@@ -1,35 +1,148 @@
 import chess.engine
+import chess.syzygy
+import datetime
+import heapq
+import itertools
 import math
 import os
+import random
 import re
+import time
 from reconchess import *
 
+import static_evaluation
+from checkpoint import Checkpointer, Snapshot, read_snapshot
+from evaluation import EvaluationPlanner, classify_hypotheses, cluster_hypotheses, relevant_squares
+from move_prior import MovePrior
+from opening_book import OpeningBook, decode_belief
+from profiling import MB, current_bytes, profile_phase, report
+from shared_belief import BeliefWorkers
+
 STOCKFISH_ENV_VAR = "STOCKFISH_EXECUTABLE"
 STOCKFISH_THREADS = 6
+CHECKPOINT_ENV_VAR = "AXOLOTL_CHECKPOINT_DIR"
+BOOK_ENV_VAR = "AXOLOTL_OPENING_BOOK"
+MOVE_PRIOR_ENV_VAR = "AXOLOTL_MOVE_PRIOR"
+SYZYGY_ENV_VAR = "SYZYGY_DIRECTORY"
+STATIC_MASS = 0.05  # fraction of probability held by the least likely hypotheses, which are scored with static evaluation
+STATIC_SECONDS = 60  # with less time left, all hypotheses are scored with static evaluation
+CLUSTER_MASS_ENV_VAR = "AXOLOTL_CLUSTER_MASS"
+CLUSTER_MASS = 0.05  # default fraction of probability held by hypotheses scored through a representative of their cluster
+CLUSTER_VALIDATE_ENV_VAR = "AXOLOTL_VALIDATE_CLUSTERS"  # if set, also score moves without clustering and compare
+WORKERS_ENV_VAR = "AXOLOTL_WORKERS"
+WORKER_MIN_HYPOTHESES = 10000  # smaller beliefs are handled in this process
+SENSE_SAMPLE_MIN_HYPOTHESES = 100000  # larger beliefs choose the square to sense from a sample, see sample_sense
+SENSE_SAMPLE_PAIRS = 256  # initial number of sampled pairs of hypotheses, doubled until the best square is separated
+SENSE_SAMPLE_SECONDS = 5  # time cap of sampling
+SENSE_CONFIDENCE_Z = 3.0  # width of confidence bounds in standard errors
+SENSE_TOLERANCE = 0.01  # squares whose expected remaining probability differs by less are not told apart
+MEMORY_LIMIT_ENV_VAR = "AXOLOTL_MEMORY_LIMIT"  # soft limit in MB, see enforce_memory_limit
+MEMORY_LIMIT_FRACTION = 0.8  # fraction of the soft limit to get back under when it is exceeded
+PRUNE_MASS = 0.001  # fraction of probability removed from the least likely hypotheses after expansion with a move prior
+
+
+def open_engine():
+    """
+    Starts a Stockfish process from the executable given by the STOCKFISH_EXECUTABLE environment variable.
+    :return: chess.engine.SimpleEngine
+    """
+    if STOCKFISH_ENV_VAR not in os.environ:
+        raise Exception("No environment variable for Stockfish executable")
+    stockfish_path = os.environ[STOCKFISH_ENV_VAR]
+    if not os.path.exists(stockfish_path):
+        raise Exception("Stockfish executable not found at " + stockfish_path)
+    engine = chess.engine.SimpleEngine.popen_uci(stockfish_path, setpgrp=True)
+    engine.configure({"Threads": STOCKFISH_THREADS})
+    return engine
+
+
+def slide_submove_graph():
+    """
+    :return: the part of AxolotlBot.generate_submove_graph without castling, which is the same in every position
+    """
+    g = {}
+    root = chess.Move.null()
+    for a in range(64):
+        # move to the right
+        for d in [-7, 1, 9]:
+            b = a + d
+            if 0 <= b < 64 and b % 8 != 0:
+                g[chess.Move(a, b)] = root
+                b = a + 2 * d
+                while 0 <= b < 64 and b % 8 != 0:
+                    g[chess.Move(a, b)] = chess.Move(a, b - d)
+                    b += d
+        # move to the left
+        for d in [-9, -1, 7]:
+            b = a + d
+            if 0 <= b < 64 and b % 8 != 7:
+                g[chess.Move(a, b)] = root
+                b = a + 2 * d
+                while 0 <= b < 64 and b % 8 != 7:
+                    g[chess.Move(a, b)] = chess.Move(a, b - d)
+                    b += d
+        # move vertically
+        for d in [-8, 8]:
+            b = a + d
+            if 0 <= b < 64:
+                g[chess.Move(a, b)] = root
+                b = a + 2 * d
+                while 0 <= b < 64:
+                    g[chess.Move(a, b)] = chess.Move(a, b - d)
+                    b += d
+    return g
+
+
+SLIDE_SUBMOVE_GRAPH = slide_submove_graph()
 
 
 class AxolotlBot(Player):
-    def __init__(self):
+    def __init__(self, engine_pool=None):
         self.color = None
         self.friendly_board = None  # chess.Board object of our pieces
         self.hypotheses = None  # dictionary mapping fen strings to probability
         self.sense = None
         self.move = None
         self.engine = None
+        self.engine_pool = engine_pool  # EnginePool shared with other games, see engine_pool.py
+        self.seconds_left = math.inf
+        self.checkpointer = None
+        self.book = None  # OpeningBook, see opening_book.py
+        self.in_book = False
+        self.move_prior = None  # MovePrior, see move_prior.py
+        self.tablebase = None  # chess.syzygy.Tablebase
+        self.tablebase_pieces = 0  # largest number of pieces in a loaded table
+        self.tablebase_cache = {}  # maps epd to score, kept across turns and games
+        self.workers = None  # BeliefWorkers, see shared_belief.py
+        self.memory_limit = None  # soft limit in bytes
+        self.hypotheses_cap = None  # largest number of hypotheses kept, set when the soft memory limit is first exceeded
+        self.cluster_mass = CLUSTER_MASS  # error budget of cluster_hypotheses, 0 to evaluate every hypothesis
+
+    def reset(self):
+        """
+        Clears the state of the current game, so the bot can play another game without being created again.
+        The engine, opening book, move prior, tablebases and their caches are kept.
+        """
+        self.color = None
+        self.friendly_board = None
+        self.hypotheses = None
+        self.sense = None
+        self.move = None
+        self.seconds_left = math.inf
+        self.in_book = False
+        self.hypotheses_cap = None
+        if self.checkpointer is not None:
+            self.checkpointer.close()
+            self.checkpointer = None
 
     def start_engine(self):
         print("Starting new engine")
 
-        if STOCKFISH_ENV_VAR not in os.environ:
-            raise Exception("No environment variable for Stockfish executable")
-        stockfish_path = os.environ[STOCKFISH_ENV_VAR]
-        if not os.path.exists(stockfish_path):
-            raise Exception("Stockfish executable not found at " + stockfish_path)
-        self.engine = chess.engine.SimpleEngine.popen_uci(stockfish_path, setpgrp=True)
-        self.engine.configure({"Threads": STOCKFISH_THREADS})
-        
+        self.engine = open_engine()
+
         print("PID: " + re.findall(r'\d+', repr(self.engine))[0])
 
+    @profile_phase
     def handle_game_start(self, color: Color, board: chess.Board, opponent_name: str):
         print("Game started against " + opponent_name)
 
@@ -45,9 +158,91 @@ class AxolotlBot(Player):
         else:
             self.friendly_board.castling_rights &= chess.BB_A8 | chess.BB_H8
         self.hypotheses = {board.fen(shredder=True): 1.0}
+        self.hypotheses_cap = None
+        if MEMORY_LIMIT_ENV_VAR in os.environ:
+            self.memory_limit = float(os.environ[MEMORY_LIMIT_ENV_VAR]) * MB
+        if CLUSTER_MASS_ENV_VAR in os.environ:
+            self.cluster_mass = float(os.environ[CLUSTER_MASS_ENV_VAR])
+
+        # worker processes, started before the engine so they do not inherit its threads
+        if self.workers is None and WORKERS_ENV_VAR in os.environ:
+            self.workers = BeliefWorkers(int(os.environ[WORKERS_ENV_VAR]))
+            print("Started " + str(self.workers.processes) + " worker processes")
 
         # engine
-        self.start_engine()
+        if self.engine_pool is None:
+            self.start_engine()
+
+        # checkpoints
+        if CHECKPOINT_ENV_VAR in os.environ:
+            timestamp = datetime.datetime.now().strftime('%Y_%m_%d-%H_%M_%S')
+            name = "{}-{}-{}.ckpt".format(timestamp, opponent_name, chess.COLOR_NAMES[color])
+            self.checkpointer = Checkpointer(os.path.join(os.environ[CHECKPOINT_ENV_VAR], name))
+            print("Checkpointing to " + self.checkpointer.path)
+        # opening book
+        if self.book is None and BOOK_ENV_VAR in os.environ:
+            self.book = OpeningBook(os.environ[BOOK_ENV_VAR])
+            print("Loaded opening book with " + str(len(self.book)) + " entries")
+        self.in_book = self.book is not None
+
+        # opponent move prior
+        if self.move_prior is None and MOVE_PRIOR_ENV_VAR in os.environ:
+            self.move_prior = MovePrior.from_file(os.environ[MOVE_PRIOR_ENV_VAR])
+            print("Loaded move prior")
+
+        # endgame tablebases
+        if self.tablebase is None and SYZYGY_ENV_VAR in os.environ:
+            self.tablebase = chess.syzygy.open_tablebase(os.environ[SYZYGY_ENV_VAR], load_dtz=False)
+            self.tablebase_pieces = max((len(name) - 1 for name in self.tablebase.wdl), default=0)
+            print("Loaded " + str(len(self.tablebase.wdl)) + " Syzygy tables")
+
+        self.save_checkpoint("handle_game_start")
+
+    def book_lookup(self, kind, observation=""):
+        """
+        Looks up the decision for the current hypotheses in the opening book.
+        After the first miss, the book is not used for the rest of the game.
+        :param kind: kind of entry, see opening_book.py
+        :param observation: observation the decision is made from, if any
+        :return: bytes of stored value or None
+        """
+        if not self.in_book:
+            return None
+        value = self.book.get(kind, self.hypotheses, observation)
+        if value is None:
+            print("Left opening book")
+            self.in_book = False
+        return value
+
+    def save_checkpoint(self, phase):
+        """
+        Saves our state in the background if checkpointing is enabled.
+        Handlers replace self.hypotheses with a new dictionary instead of modifying it,
+        so the snapshot can hold a reference to it without copying.
+        :param phase: name of the handler that just finished
+        """
+        if self.checkpointer is None:
+            return
+        self.checkpointer.submit(Snapshot(self.color, self.friendly_board.fen(), self.hypotheses, self.sense, self.move, phase))
+
+    def restore_checkpoint(self, path):
+        """
+        Restores the state saved in a checkpoint file, e.g. after the process crashed mid-game.
+        Starts the engine if needed.
+        :param path: path of checkpoint file
+        :return: name of the last handler before the checkpoint
+        """
+        snapshot = read_snapshot(path)
+        self.color = snapshot.color
+        self.friendly_board = chess.Board(snapshot.friendly_fen)
+        self.hypotheses = snapshot.hypotheses
+        self.sense = snapshot.sense
+        self.move = snapshot.move
+        print("Restored " + str(len(self.hypotheses)) + " hypotheses after " + snapshot.phase)
+
+        if self.engine is None and self.engine_pool is None:
+            self.start_engine()
+        return snapshot.phase
 
     def check_friendly_pieces(self):
         """
@@ -66,10 +261,31 @@ class AxolotlBot(Player):
                     if h_piece != piece:
                         raise Exception("hypothesis does not match friendly board")
 
+    def validate_friendly_pieces(self, rate=1.0):
+        """
+        Faster version of check_friendly_pieces that does a single comparison per hypothesis.
+        Each hypothesis is converted to an expanded FEN string with all opponent pieces masked out,
+        which must be equal to the expanded FEN string of self.friendly_board.
+        :param rate: fraction of hypotheses to check, sampled uniformly at random
+        """
+        expected = self.expand_fen(self.friendly_board.fen())
+        opponent_symbols = "pnbrqk" if self.color else "PNBRQK"
+        mask = str.maketrans(opponent_symbols, '.' * len(opponent_symbols))
+
+        if rate >= 1:
+            sample = self.hypotheses.keys()
+        else:
+            sample = random.sample(list(self.hypotheses), math.ceil(rate * len(self.hypotheses)))
+
+        for h in sample:
+            if self.expand_fen(h).translate(mask) != expected:
+                raise Exception("hypothesis does not match friendly board")
+
     def check_hypotheses(self, board):
         if board.fen(shredder=True) not in self.hypotheses:
             raise Exception("board not in hypotheses")
 
+    @profile_phase
     def handle_opponent_move_result(self, captured_my_piece: bool, capture_square: Optional[Square]):
         print("Turn " + str(self.friendly_board.fullmove_number))
         print("Handling opponent move result")
@@ -83,8 +299,27 @@ class AxolotlBot(Player):
         if captured_my_piece:
             self.friendly_board.remove_piece_at(capture_square)
 
+        value = self.book_lookup("expand", str(capture_square) if captured_my_piece else "")
+        if value is not None:
+            self.hypotheses = decode_belief(value)
+        else:
+            self.hypotheses = self.expand_hypotheses(captured_my_piece, capture_square)
+            if self.move_prior is not None:
+                self.hypotheses = self.prune_hypotheses(self.hypotheses, PRUNE_MASS)
+            self.enforce_memory_limit()
+
+        print("Hypotheses count (after): " + str(len(self.hypotheses)))
+        self.save_checkpoint("handle_opponent_move_result")
+
+    def expand_hypotheses(self, captured_my_piece, capture_square):
+        """
+        :param captured_my_piece: if opponent captured one of our pieces
+        :param capture_square: square of captured piece
+        :return: dictionary of hypotheses after opponent's turn
+        """
         # Calculate next hypotheses and their probabilities of the board after opponent's turn.
-        # Assume opponent is equally likely to choose any valid move.
+        # With a move prior, the opponent chooses a valid move with probability proportional to its weight.
+        # Otherwise, assume opponent is equally likely to choose any valid move.
         # In practice, opponents do not seem to play invalid moves such as invalid pawn captures.
         # Then assume the probability the opponent plays an invalid move/pass is equal to the probability of any valid move.
         new_hypotheses = {}
@@ -106,17 +341,61 @@ class AxolotlBot(Player):
                         moves.add(chess.Move.from_uci("e1c1"))
                     if self.color == chess.WHITE and board.color_at(chess.D8) is None and board.color_at(chess.C8) is None and board.color_at(chess.B8) is None:
                         moves.add(chess.Move.from_uci("e8c8"))
-            for move in moves:
+            moves = list(moves)
+            if self.move_prior is None:
+                weights = [1.0] * len(moves)
+            else:
+                weights = [self.move_prior.weight(board, move) for move in moves]
+            tot = sum(weights)
+            for move, w in zip(moves, weights):
                 board.push(move)
                 fen = board.fen(shredder=True)
                 if fen in new_hypotheses:
-                    new_hypotheses[fen] += p / len(moves)
+                    new_hypotheses[fen] += p * w / tot
                 else:
-                    new_hypotheses[fen] = p / len(moves)
+                    new_hypotheses[fen] = p * w / tot
                 board.pop()
-        self.hypotheses = new_hypotheses
+        return new_hypotheses
 
-        print("Hypotheses count (after): " + str(len(self.hypotheses)))
+    @staticmethod
+    def prune_hypotheses(hypotheses, mass):
+        """
+        Removes the least likely hypotheses whose total probability is at most mass times the total probability.
+        Probabilities are not normalized.
+        :param hypotheses: dictionary mapping fen strings to probability
+        :param mass: fraction of probability to remove
+        :return: dictionary of remaining hypotheses
+        """
+        items = sorted(hypotheses.items(), key=lambda x: x[1])
+        limit = mass * sum(hypotheses.values())
+        removed = 0
+        i = 0
+        while i < len(items) and removed + items[i][1] <= limit:
+            removed += items[i][1]
+            i += 1
+        return dict(items[i:])
+
+    def enforce_memory_limit(self):
+        """
+        Keeps memory use under the soft limit by pruning the least likely hypotheses. The first time memory use exceeds
+        the limit, the number of hypotheses that fit in MEMORY_LIMIT_FRACTION of it is estimated and kept as a cap for
+        the rest of the game. Resident memory is not always returned to the system after pruning, so it is not measured
+        again once there is a cap.
+        """
+        if self.memory_limit is None:
+            return
+        if self.hypotheses_cap is None:
+            used = current_bytes()
+            if used is None or used <= self.memory_limit:
+                return
+            self.hypotheses_cap = max(int(len(self.hypotheses) * MEMORY_LIMIT_FRACTION * self.memory_limit / used), 1)
+            print("Memory use of " + str(used // MB) + " MB is over the soft limit of " + str(int(self.memory_limit // MB)) +
+                  " MB, keeping at most " + str(self.hypotheses_cap) + " hypotheses")
+        if len(self.hypotheses) > self.hypotheses_cap:
+            hypotheses = dict(heapq.nlargest(self.hypotheses_cap, self.hypotheses.items(), key=lambda x: x[1]))
+            tot = sum(hypotheses.values())
+            self.hypotheses = {h: p / tot for h, p in hypotheses.items()}
+            print("Pruned to " + str(len(self.hypotheses)) + " hypotheses")
 
     @staticmethod
     def expand_fen(fen):
@@ -147,30 +426,32 @@ class AxolotlBot(Player):
         """
         return s[square - 9:square - 6] + s[square - 1:square + 2] + s[square + 7:square + 10]
 
+    @profile_phase
     def choose_sense(self, sense_actions: List[Square], move_actions: List[chess.Move], seconds_left: float) -> Optional[Square]:
         print("Choosing sense")
+        self.seconds_left = seconds_left
 
-        # distributions will be a map from square to some distribution
-        # initialize distributions
-        distributions = {}
-        for i in range(1, 7):
-            for j in range(1, 7):
-                distributions[8 * i + j] = {}
+        value = self.book_lookup("sense")
+        if value is not None:
+            self.sense = value[0]
+        elif len(self.hypotheses) >= SENSE_SAMPLE_MIN_HYPOTHESES:
+            self.sense = self.sample_sense()
+        else:
+            self.sense = self.best_sense()
 
-        for h, p in self.hypotheses.items():
-            # create simple string representation of each board for easy sensing
-            s = self.expand_fen(h)
-            # sense each square of the board and tally up results in distributions
-            for i in range(1, 7):
-                for j in range(1, 7):
-                    square = 8 * i + j
-                    dist = distributions[square]
-                    result = self.sense_expanded_fen(s, square)
-                    if result in dist:
-                        (q, c) = dist[result]
-                        dist[result] = (p + q, c + 1)
-                    else:
-                        dist[result] = (p, 1)
+        print("Sensed square " + chess.SQUARE_NAMES[self.sense])
+        self.save_checkpoint("choose_sense")
+
+        return self.sense
+
+    def best_sense(self):
+        """
+        :return: square to sense that minimizes the maximum number of hypotheses remaining
+        """
+        if self.workers is not None and len(self.hypotheses) >= WORKER_MIN_HYPOTHESES:
+            distributions = self.workers.tally_senses(self.hypotheses)
+        else:
+            distributions = self.tally_senses(self.hypotheses.items())
 
         # each value in distributions is a map from sense result to (probability, count)
         # modify distributions in place so that each value is a map from number of hypotheses remaining to probability
@@ -184,7 +465,7 @@ class AxolotlBot(Player):
 
         # choose which square by minimizing some function f
         f_min = math.inf
-        self.sense = None
+        sense = None
         for square, dist in distributions.items():
             # f = maximum number of hypotheses remaining
             f = max(dist, key=dist.get)
@@ -197,12 +478,90 @@ class AxolotlBot(Player):
             # take min
             if f < f_min:
                 f_min = f
-                self.sense = square
+                sense = square
+        return sense
 
-        print("Sensed square " + chess.SQUARE_NAMES[self.sense])
+    def sample_sense(self, seconds=SENSE_SAMPLE_SECONDS, pairs=SENSE_SAMPLE_PAIRS):
+        """
+        Chooses the square to sense from pairs of hypotheses sampled by probability, so the cost depends on how close
+        the decision is rather than on the size of the belief.
+        Both hypotheses of a pair give the same sense result on a square with probability equal to the expected
+        probability of hypotheses remaining after sensing it, which is estimated for every square by the fraction of
+        pairs that agree. The sample doubles until the best square is ahead of every other square by a confidence bound
+        (or within SENSE_TOLERANCE of it), or until seconds have passed.
+        :param seconds: time cap
+        :param pairs: initial number of pairs
+        :return: square to sense that minimizes the expected probability of hypotheses remaining
+        """
+        start = time.time()
+        fens = list(self.hypotheses)
+        cum_weights = list(itertools.accumulate(self.hypotheses.values()))
+        squares = [8 * i + j for i in range(1, 7) for j in range(1, 7)]
+        results = {}  # maps fen to sense results on squares, for sampled hypotheses
+        agreements = []  # for each pair, tuple of whether the pair agrees on each square
+
+        n = pairs
+        while True:
+            sample = random.choices(fens, cum_weights=cum_weights, k=2 * (n - len(agreements)))
+            for h in sample:
+                if h not in results:
+                    s = self.expand_fen(h)
+                    results[h] = [self.sense_expanded_fen(s, square) for square in squares]
+            for a, b in zip(sample[::2], sample[1::2]):
+                agreements.append(tuple(x == y for x, y in zip(results[a], results[b])))
+
+            totals = [sum(pair[i] for pair in agreements) for i in range(len(squares))]
+            best = min(range(len(squares)), key=totals.__getitem__)
+            separated = True
+            for i in range(len(squares)):
+                if i == best:
+                    continue
+                # paired differences between best and square i, each -1, 0 or 1
+                mean = (totals[best] - totals[i]) / n
+                squared = sum(pair[best] != pair[i] for pair in agreements) / n
+                error = math.sqrt(max(squared - mean * mean, 0) / (n - 1))
+                if mean + SENSE_CONFIDENCE_Z * error >= SENSE_TOLERANCE:
+                    separated = False
+                    break
+            if separated or time.time() - start > seconds or 2 * n >= len(fens):
+                break
+            n *= 2
+
+        print("Sampled " + str(n) + " pairs of hypotheses in " + str(round(time.time() - start, 2)) + " seconds, " +
+              ("separated" if separated else "not separated"))
+        return squares[best]
 
-        return self.sense
+    @staticmethod
+    def tally_senses(items):
+        """
+        Tallies up the results of sensing every square not on the edge of the board.
+        :param items: iterable of hypotheses and their probabilities
+        :return: map from square to a map from sense result to (probability, count)
+        """
+        # distributions will be a map from square to some distribution
+        # initialize distributions
+        distributions = {}
+        for i in range(1, 7):
+            for j in range(1, 7):
+                distributions[8 * i + j] = {}
+
+        for h, p in items:
+            # create simple string representation of each board for easy sensing
+            s = AxolotlBot.expand_fen(h)
+            # sense each square of the board and tally up results in distributions
+            for i in range(1, 7):
+                for j in range(1, 7):
+                    square = 8 * i + j
+                    dist = distributions[square]
+                    result = AxolotlBot.sense_expanded_fen(s, square)
+                    if result in dist:
+                        (q, c) = dist[result]
+                        dist[result] = (p + q, c + 1)
+                    else:
+                        dist[result] = (p, 1)
+        return distributions
 
+    @profile_phase
     def handle_sense_result(self, sense_result: List[Tuple[Square, Optional[chess.Piece]]]):
         print("Handling sense result")
         print("Hypotheses count (before): " + str(len(self.hypotheses)))
@@ -210,7 +569,38 @@ class AxolotlBot(Player):
         if self.sense is None:
             return
 
-        # parse sense result
+        result = self.sense_result_string(sense_result)
+
+        value = self.book_lookup("filter", result)
+        if value is not None:
+            self.hypotheses = decode_belief(value)
+        else:
+            # remove hypotheses with different sense result
+            if self.workers is not None and len(self.hypotheses) >= WORKER_MIN_HYPOTHESES:
+                self.hypotheses = self.workers.filter(self.hypotheses, self.sense, result)
+            else:
+                new_hypotheses = {}
+                for h, p in self.hypotheses.items():
+                    s = self.expand_fen(h)
+                    if result == self.sense_expanded_fen(s, self.sense):
+                        new_hypotheses[h] = p
+                self.hypotheses = new_hypotheses
+
+            # normalize probabilities
+            tot = sum(self.hypotheses.values())
+            for h, p in self.hypotheses.items():
+                self.hypotheses[h] = p / tot
+
+        print("Hypotheses count (after): " + str(len(self.hypotheses)))
+        self.save_checkpoint("handle_sense_result")
+
+    @staticmethod
+    def sense_result_string(sense_result):
+        """
+        Returns the sense result in the same format as sense_expanded_fen.
+        :param sense_result: list of squares and pieces, sorted in place
+        :return: string of length 9
+        """
         result = ""
         sense_result.sort(key=lambda x: x[0])
         for square, piece in sense_result:
@@ -218,19 +608,7 @@ class AxolotlBot(Player):
                 result += piece.symbol()
             else:
                 result += '.'
-
-        # remove hypotheses with different sense result
-        for h, p in list(self.hypotheses.items()):
-            s = self.expand_fen(h)
-            if result != self.sense_expanded_fen(s, self.sense):
-                del self.hypotheses[h]
-
-        # normalize probabilities
-        tot = sum(self.hypotheses.values())
-        for h, p in self.hypotheses.items():
-            self.hypotheses[h] = p / tot
-
-        print("Hypotheses count (after): " + str(len(self.hypotheses)))
+        return result
 
     def generate_submove_graph(self):
         """
@@ -242,39 +620,9 @@ class AxolotlBot(Player):
         The null move is considered a valid move.
         :return: directed graph of submoves
         """
-        g = {}
+        g = dict(SLIDE_SUBMOVE_GRAPH)
         root = chess.Move.null()
 
-        # slide moves
-        for a in range(64):
-            # move to the right
-            for d in [-7, 1, 9]:
-                b = a + d
-                if 0 <= b < 64 and b % 8 != 0:
-                    g[chess.Move(a, b)] = root
-                    b = a + 2 * d
-                    while 0 <= b < 64 and b % 8 != 0:
-                        g[chess.Move(a, b)] = chess.Move(a, b - d)
-                        b += d
-            # move to the left
-            for d in [-9, -1, 7]:
-                b = a + d
-                if 0 <= b < 64 and b % 8 != 7:
-                    g[chess.Move(a, b)] = root
-                    b = a + 2 * d
-                    while 0 <= b < 64 and b % 8 != 7:
-                        g[chess.Move(a, b)] = chess.Move(a, b - d)
-                        b += d
-            # move vertically
-            for d in [-8, 8]:
-                b = a + d
-                if 0 <= b < 64:
-                    g[chess.Move(a, b)] = root
-                    b = a + 2 * d
-                    while 0 <= b < 64:
-                        g[chess.Move(a, b)] = chess.Move(a, b - d)
-                        b += d
-
         # castling
         if self.friendly_board.has_kingside_castling_rights(self.color):
             if self.color:
@@ -289,105 +637,208 @@ class AxolotlBot(Player):
 
         return g
 
+    @staticmethod
+    def sigmoid(x):
+        return 1 / (1 + math.pow(10, -x / 400))
+
+    def probe_tablebase(self, board):
+        """
+        Scores a board from the perspective of our color with the Syzygy tablebases.
+        Wins and losses prevented by the 50 move rule are counted as wins and losses.
+        :param board: board
+        :return: 1.0, 0.5 or 0.0, or None if the board is not in the tablebases
+        """
+        if self.tablebase is None or chess.popcount(board.occupied) > self.tablebase_pieces or board.castling_rights:
+            return None
+        key = board.epd()
+        if key in self.tablebase_cache:
+            return self.tablebase_cache[key]
+        wdl = self.tablebase.get_wdl(board)
+        if wdl is None:
+            return None
+        # wdl is from the perspective of the side to move
+        if board.turn != self.color:
+            wdl = -wdl
+        score = 1.0 if wdl > 0 else 0.0 if wdl < 0 else 0.5
+        self.tablebase_cache[key] = score
+        return score
+
+    def evaluate_static(self, boards):
+        """
+        Evaluates boards without the engine from the perspective of our color, see static_evaluation.py.
+        :param boards: list of boards
+        :return: list of scores between 0 and 1
+        """
+        return [self.sigmoid(x) for x in static_evaluation.evaluate_boards(boards, self.color)]
+
+    def evaluate(self, board, time, move=None):
+        """
+        Evaluates a board with the engine from the perspective of our color.
+        Uses the shared engine pool (and its evaluation cache) if there is one, otherwise self.engine.
+        :param board: board
+        :param time: time limit of search in seconds
+        :param move: if not None, only this move is searched
+        :return: score between 0 and 1
+        """
+        root_moves = None if move is None else [move]
+        try:
+            if self.engine_pool is None:
+                info = self.engine.analyse(board, chess.engine.Limit(time=time), info=chess.engine.INFO_SCORE, root_moves=root_moves)
+            else:
+                info = self.engine_pool.analyse(board, chess.engine.Limit(time=time), self.seconds_left, root_moves=root_moves)
+        except chess.engine.EngineTerminatedError:
+            print("Stockfish crashed")
+            print("Time: " + str(time) + "s")
+            print("Move: " + ("None" if move is None else move.uci()))
+            print("Board: ")
+            print(board)
+            print(str(board.fen(shredder=True)))
+            if self.engine_pool is None:
+                self.start_engine()
+            return 0.5
+
+        score = info["score"].pov(self.color)
+        if score.is_mate():
+            if score.mate() > 0:
+                return 1.0
+            else:
+                return 0.0
+        return self.sigmoid(score.score())
+
+    @profile_phase
     def choose_move(self, move_actions: List[chess.Move], seconds_left: float) -> Optional[chess.Move]:
         print("Choosing move")
+        self.seconds_left = seconds_left
 
-        distributions = {chess.Move.null(): {}}  # maps move to a distribution, each distribution is a map from score to probability
+        value = self.book_lookup("move")
+        if value is not None:
+            self.move = chess.Move.from_uci(bytes(value).decode("ascii"))
+        else:
+            self.move = self.best_move(move_actions)
+
+        print("Choose move " + self.move.uci())
+        self.save_checkpoint("choose_move")
+
+        if self.move == chess.Move.null():
+            return None
+        return self.move
+
+    def best_move(self, move_actions):
+        """
+        :param move_actions: list of moves, sorted in place
+        :return: move with the highest expected score, chess.Move.null() to pass
+        """
         graph = self.generate_submove_graph()  # see generate_submove_graph for details
         # sort move_actions in topological order according to graph
         move_actions.sort(key=lambda x: (x.from_square, abs(x.from_square % 8 - x.to_square % 8) + abs(x.from_square // 8 - x.to_square // 8)))
+
+        # the least likely hypotheses only get a static evaluation, or all of them if we are short on time
+        if static_evaluation.np is None:
+            exact = self.hypotheses
+        elif self.seconds_left < STATIC_SECONDS:
+            exact = {}
+        else:
+            exact = self.prune_hypotheses(self.hypotheses, STATIC_MASS)
+
+        mated, capturable, search = classify_hypotheses(self.hypotheses, self.color)
+        print("Checkmated in " + str(len(mated)) + " hypotheses, can take king in " + str(len(capturable)) + ", searching " + str(len(search)))
+
+        # hypotheses that only differ away from our king and move paths are scored through a representative
+        relevant = relevant_squares(self.friendly_board, self.color, move_actions, graph)
+        clustered, left_out = cluster_hypotheses(search, self.color, relevant, self.cluster_mass * sum(self.hypotheses.values()))
+        if left_out:
+            print("Clustered " + str(left_out) + " hypotheses into representatives, searching " + str(len(clustered)))
+
+        expected = self.expected_scores(move_actions, graph, mated, capturable, clustered, exact)
+        for move, f in expected.items():
+            print(move.uci() + " " + str(f))
+        # choose move by maximizing expected score
+        best = max(expected, key=expected.get)
+
+        if CLUSTER_VALIDATE_ENV_VAR in os.environ and left_out:
+            exhaustive = self.expected_scores(move_actions, graph, mated, capturable, search, exact)
+            best_exhaustive = max(exhaustive, key=exhaustive.get)
+            print("Cluster validation: chose " + best.uci() + ", exhaustive evaluation chooses " + best_exhaustive.uci() +
+                  ", expected score lost " + str(exhaustive[best_exhaustive] - exhaustive[best]))
+        return best
+
+    def expected_scores(self, move_actions, graph, mated, capturable, search, exact):
+        """
+        :param move_actions: list of moves in topological order according to graph
+        :param graph: submove graph, see generate_submove_graph
+        :param mated: see classify_hypotheses
+        :param capturable: see classify_hypotheses
+        :param search: see classify_hypotheses
+        :param exact: hypotheses evaluated with the engine, others get a static evaluation
+        :return: map from null move and move_actions to expected score
+        """
+        distributions = {chess.Move.null(): {}}  # maps move to a distribution, each distribution is a map from score to probability
         for move in move_actions:
             distributions[move] = {}
 
-        target_time = 30
-        time = (target_time - 0.1) / (len(self.hypotheses) * (len(move_actions) + 1))
-
         def add(dictionary, key, value):
             if key in dictionary:
                 dictionary[key] += value
             else:
                 dictionary[key] = value
 
-        def sigmoid(x):
-            return 1 / (1 + math.pow(10, -x / 400))
-
-        # find distributions
-        for h, p in self.hypotheses.items():
-            board = chess.Board(h)
+        # score hypotheses where we are in checkmate
+        for p in mated:
+            for move in move_actions:
+                add(distributions[move], 0.5, p)
 
-            # first check if we are in checkmate
-            if board.is_checkmate():
-                for move in move_actions:
-                    add(distributions[move], 0.5, p)
-                continue
-
-            # next check if we can take their king
-            if board.is_attacked_by(self.color, board.king(not self.color)):
-                for move in move_actions:
-                    if move.to_square == board.king(not self.color):
-                        add(distributions[move], 1.0, p)
-                    else:
-                        add(distributions[move], 0.0, p)
-                continue
+        # score hypotheses where we can take their king
+        for king, p in capturable:
+            for move in move_actions:
+                if move.to_square == king:
+                    add(distributions[move], 1.0, p)
+                else:
+                    add(distributions[move], 0.0, p)
 
+        # first pass: plan the positions reached by every legal move of the other hypotheses
+        planner = EvaluationPlanner()
+        pending = []  # list of (probability, map from null move and legal moves to key of resulting position)
+        for h, board, p in search:
+            static = h not in exact
             legal_moves = set(board.pseudo_legal_moves)
+            keys = {}
+            for move in [chess.Move.null()] + move_actions:
+                if move in legal_moves or move == chess.Move.null():
+                    board.push(move)
+                    # moves that leave our king capturable lose (key None), the engine can not search such positions
+                    keys[move] = None if board.was_into_check() else planner.add(board, static)
+                    board.pop()
+            pending.append((p, keys))
+
+        # evaluate each distinct position once, with tablebases if possible
+        probed = planner.resolve(self.probe_tablebase) if self.tablebase is not None else 0
+        target_time = 30
+        time = (target_time - 0.1) / max(len(planner), 1)
+        print("Evaluating " + str(len(planner)) + " positions, " + str(len(planner.static_positions)) + " statically, probed "
+              + str(probed) + " in tablebases, avoided " + str(planner.avoided()) + " evaluations")
+        position_scores = planner.run(lambda board: self.evaluate(board, time), self.evaluate_static)
+        position_scores[None] = 0.0
+
+        # second pass: find distributions
+        for p, keys in pending:
             scores = {}
 
             # process null move (root) first
-            board.push(chess.Move.null())
-            try:
-                info = self.engine.analyse(board, chess.engine.Limit(time=time), info=chess.engine.INFO_SCORE)
-                score = info["score"].pov(self.color)
-                if score.is_mate():
-                    if score.mate() > 0:
-                        scores[chess.Move.null()] = 1.0
-                    else:
-                        scores[chess.Move.null()] = 0.0
-                else:
-                    scores[chess.Move.null()] = sigmoid(score.score())
-            except chess.engine.EngineTerminatedError:
-                scores[chess.Move.null()] = 0.5
-                print("Stockfish crashed")
-                print("Time: " + str(time) + "s")
-                print("Move: None")
-                print("Board: ")
-                print(board)
-                print(str(board.fen(shredder=True)))
-                self.start_engine()
+            scores[chess.Move.null()] = position_scores[keys[chess.Move.null()]]
             add(distributions[chess.Move.null()], scores[chess.Move.null()], p)
-            board.pop()
 
             # process rest of moves in topological order
             for move in move_actions:
                 # legal move
-                if move in legal_moves:
-                    try:
-                        info = self.engine.analyse(board, chess.engine.Limit(time=time), info=chess.engine.INFO_SCORE, root_moves=[move])
-                        score = info["score"].pov(self.color)
-                        if score.is_mate():
-                            if score.mate() > 0:
-                                scores[move] = 1.0
-                            else:
-                                scores[move] = 0.0
-                        else:
-                            scores[move] = sigmoid(score.score())
-                    except chess.engine.EngineTerminatedError:
-                        scores[move] = 0.5
-                        print("Stockfish crashed")
-                        print("Time: " + str(time) + "s")
-                        print("Move: " + move.uci())
-                        print("Board: ")
-                        print(board)
-                        print(str(board.fen(shredder=True)))
-                        self.start_engine()
+                if move in keys:
+                    scores[move] = position_scores[keys[move]]
                 # blocked move
                 else:
                     scores[move] = scores[graph[move]]
                 add(distributions[move], scores[move], p)
 
-        # choose move by maximizing some function f
-        f_max = -math.inf
-        self.move = None
+        # map each distribution to some function f
+        expected = {}
         for move, dist in distributions.items():
             # f is min score
             # f = min(dist)
@@ -396,17 +847,8 @@ class AxolotlBot(Player):
             f = 0
             for s, p in dist.items():
                 f += s * p
-            print(move.uci() + " " + str(f))
-            # take max
-            if f > f_max:
-                f_max = f
-                self.move = move
-
-        print("Choose move " + self.move.uci())
-
-        if self.move == chess.Move.null():
-            return None
-        return self.move
+            expected[move] = f
+        return expected
 
     @staticmethod
     def check_move(board, move, color, capture=None, capture_square=None):
@@ -453,6 +895,7 @@ class AxolotlBot(Player):
             else:
                 return move in set(board.pseudo_legal_moves) - set(board.generate_pseudo_legal_captures())
 
+    @profile_phase
     def handle_move_result(self, requested_move: Optional[chess.Move], taken_move: Optional[chess.Move], captured_opponent_piece: bool, capture_square: Optional[Square]):
         print("Handling move result")
         print("Hypotheses count (before): " + str(len(self.hypotheses)))
@@ -488,8 +931,10 @@ class AxolotlBot(Player):
         tot = sum(self.hypotheses.values())
         for h, p in self.hypotheses.items():
             self.hypotheses[h] = p / tot
+        self.enforce_memory_limit()
 
         print("Hypotheses count (after): " + str(len(self.hypotheses)))
+        self.save_checkpoint("handle_move_result")
 
     def handle_game_end(self, winner_color: Optional[Color], win_reason: Optional[WinReason], game_history: GameHistory):
         print("Game ended")
@@ -502,6 +947,15 @@ class AxolotlBot(Player):
         self.hypotheses = None
         self.sense = None
         self.move = None
+        if self.checkpointer is not None:
+            self.checkpointer.close(remove=True)
+            self.checkpointer = None
+        if self.workers is not None:
+            self.workers.close()
+            self.workers = None
+        report()
+        if self.engine_pool is not None:
+            return
         try:
             self.engine.quit()
             self.engine = None
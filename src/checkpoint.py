@@ -0,0 +1,185 @@
+import mmap
+import os
+import struct
+import threading
+from array import array
+from collections.abc import Mapping
+
+import chess
+
+# binary snapshots of AxolotlBot state, see AxolotlBot.save_checkpoint and AxolotlBot.restore_checkpoint
+#
+# layout (little endian):
+#   header
+#   friendly board fen, requested move uci, phase name (ascii)
+#   padding to a multiple of 8 bytes
+#   probabilities of hypotheses (float64 each)
+#   fen strings of hypotheses joined by newlines (ascii)
+
+MAGIC = b"AXCK"
+VERSION = 1
+HEADER = struct.Struct("<4sHbbQHHHQ")  # magic, version, color, sense, count, friendly fen, move, phase, fens lengths
+
+
+class Snapshot:
+    def __init__(self, color, friendly_fen, hypotheses, sense, move, phase):
+        self.color = color
+        self.friendly_fen = friendly_fen
+        self.hypotheses = hypotheses  # dictionary (or MappedHypotheses) mapping fen strings to probability
+        self.sense = sense
+        self.move = move
+        self.phase = phase  # name of the last handler before the snapshot
+
+
+def write_snapshot(path, snapshot):
+    """
+    Writes a snapshot to path. The file is replaced atomically, so a crash while writing keeps the previous snapshot.
+    :param path: file path
+    :param snapshot: Snapshot
+    """
+    friendly_fen = snapshot.friendly_fen.encode("ascii")
+    move = b"" if snapshot.move is None else snapshot.move.uci().encode("ascii")
+    phase = snapshot.phase.encode("ascii")
+    fens = "\n".join(snapshot.hypotheses).encode("ascii")
+    probabilities = array("d", snapshot.hypotheses.values())
+
+    header = HEADER.pack(MAGIC, VERSION, -1 if snapshot.color is None else int(snapshot.color),
+                         -1 if snapshot.sense is None else snapshot.sense, len(probabilities),
+                         len(friendly_fen), len(move), len(phase), len(fens))
+    strings = friendly_fen + move + phase
+    padding = b"\0" * (-(len(header) + len(strings)) % 8)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(strings)
+        f.write(padding)
+        f.write(probabilities.tobytes())
+        f.write(fens)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    """
+    Reads a snapshot written by write_snapshot. Only the header is read here, the hypotheses stay in the memory mapped
+    file until they are first used, see MappedHypotheses.
+    :param path: file path
+    :return: Snapshot
+    """
+    with open(path, "rb") as f:
+        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, color, sense, count, friendly_len, move_len, phase_len, fens_len = HEADER.unpack_from(m, 0)
+    if magic != MAGIC or version != VERSION:
+        m.close()
+        raise Exception("not a checkpoint file: " + path)
+
+    offset = HEADER.size
+    friendly_fen = m[offset:offset + friendly_len].decode("ascii")
+    offset += friendly_len
+    move = m[offset:offset + move_len].decode("ascii")
+    offset += move_len
+    phase = m[offset:offset + phase_len].decode("ascii")
+    offset += phase_len
+    offset += -offset % 8
+
+    hypotheses = MappedHypotheses(m, offset, count, fens_len)
+    return Snapshot(None if color < 0 else bool(color), friendly_fen, hypotheses,
+                    None if sense < 0 else sense, chess.Move.from_uci(move) if move else None, phase)
+
+
+class MappedHypotheses(Mapping):
+    """
+    Read-only hypotheses of a snapshot backed by the memory mapped file.
+    Every handler iterates over all hypotheses once and builds a new dictionary, so the fen strings are decoded in bulk
+    on first iteration, and a dictionary is only built if a single hypothesis is looked up.
+    """
+
+    def __init__(self, m, offset, count, fens_len):
+        self.m = m
+        self.offset = offset  # start of probabilities, followed by fen strings
+        self.count = count
+        self.fens_len = fens_len
+        self.fens = None
+        self.probabilities = None
+        self.index = None
+
+    def load(self):
+        if self.fens is not None:
+            return
+        m, offset, count = self.m, self.offset, self.count
+        with memoryview(m)[offset:offset + 8 * count] as view, view.cast("d") as doubles:
+            self.probabilities = doubles.tolist()
+        offset += 8 * count
+        self.fens = m[offset:offset + self.fens_len].decode("ascii").split("\n") if count > 0 else []
+        m.close()
+        self.m = None
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        self.load()
+        return iter(self.fens)
+
+    def items(self):
+        self.load()
+        return zip(self.fens, self.probabilities)
+
+    def values(self):
+        self.load()
+        return iter(self.probabilities)
+
+    def __getitem__(self, fen):
+        if self.index is None:
+            self.load()
+            self.index = dict(zip(self.fens, self.probabilities))
+        return self.index[fen]
+
+
+class Checkpointer:
+    """
+    Writes snapshots to a file in a background thread so handlers never wait on disk.
+    Only the latest submitted snapshot is written, older pending ones are skipped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = None
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, snapshot):
+        """
+        Schedules a snapshot to be written. The snapshot must not be modified afterwards.
+        :param snapshot: Snapshot
+        """
+        with self.condition:
+            self.pending = snapshot
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending is not None or self.closed)
+                if self.pending is None:
+                    return
+                snapshot = self.pending
+                self.pending = None
+            try:
+                write_snapshot(self.path, snapshot)
+            except OSError as e:
+                print("Failed to write checkpoint: " + str(e))
+
+    def close(self, remove=False):
+        """
+        Writes the pending snapshot and stops the background thread.
+        :param remove: if True, deletes the checkpoint file afterwards
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
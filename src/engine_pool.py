@@ -0,0 +1,116 @@
+import chess.engine
+import heapq
+import itertools
+import math
+import threading
+from collections import OrderedDict
+
+from axolotl import open_engine
+
+EVALUATION_CACHE_SIZE = 1000000
+
+
+class EnginePool:
+    """
+    A fixed number of engines shared by several AxolotlBots playing games concurrently in one process.
+    When every engine is busy, waiting requests are served in order of the requesting game's remaining clock,
+    so games that are short on time get the next free engine.
+    Evaluations are stored in a cache shared by all games.
+    """
+
+    def __init__(self, size, cache_size=EVALUATION_CACHE_SIZE):
+        self.engines = [open_engine() for _ in range(size)]
+        self.idle = list(self.engines)
+        self.waiting = []  # heap of (seconds left, arrival order, [event, engine]) for requests waiting on an engine
+        self.arrivals = itertools.count()
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()  # maps (epd, root moves) to engine info, least recently used first
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, seconds_left=math.inf):
+        """
+        Blocks until an engine is free and takes it out of the pool.
+        :param seconds_left: clock of the requesting game, games with less time are served first
+        :return: engine
+        """
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+            request = [threading.Event(), None]
+            heapq.heappush(self.waiting, (seconds_left, next(self.arrivals), request))
+        request[0].wait()
+        return request[1]
+
+    def release(self, engine):
+        """
+        Returns an engine to the pool, handing it directly to the waiting request with the least time left.
+        :param engine: engine
+        """
+        with self.lock:
+            if self.waiting:
+                _, _, request = heapq.heappop(self.waiting)
+                request[1] = engine
+                request[0].set()
+            else:
+                self.idle.append(engine)
+
+    def restart(self, engine):
+        """
+        Replaces a crashed engine with a new one.
+        :param engine: crashed engine
+        :return: new engine
+        """
+        print("Restarting engine")
+        try:
+            engine.quit()
+        except chess.engine.EngineTerminatedError:
+            pass
+        new_engine = open_engine()
+        with self.lock:
+            self.engines[self.engines.index(engine)] = new_engine
+        return new_engine
+
+    def analyse(self, board, limit, seconds_left=math.inf, root_moves=None):
+        """
+        Analyses a board on the first free engine, or returns the cached result of an earlier analysis of the same
+        position and root moves regardless of its time limit.
+        Raises chess.engine.EngineTerminatedError if the engine crashed, after replacing the engine.
+        :param board: board
+        :param limit: chess.engine.Limit of the search
+        :param seconds_left: clock of the requesting game
+        :param root_moves: if not None, only these moves are searched
+        :return: engine info containing the score
+        """
+        key = (board.epd(), None if root_moves is None else tuple(root_moves))
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return self.cache[key]
+            self.misses += 1
+
+        engine = self.acquire(seconds_left)
+        try:
+            info = engine.analyse(board, limit, info=chess.engine.INFO_SCORE, root_moves=root_moves)
+        except chess.engine.EngineTerminatedError:
+            engine = self.restart(engine)
+            raise
+        finally:
+            self.release(engine)
+
+        with self.lock:
+            self.cache[key] = info
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return info
+
+    def quit(self):
+        print("Shutting engine pool down")
+        print("Evaluation cache hits: " + str(self.hits) + ", misses: " + str(self.misses))
+        for engine in self.engines:
+            try:
+                engine.quit()
+            except chess.engine.EngineTerminatedError:
+                pass
@@ -0,0 +1,187 @@
+import chess
+
+# planning of the evaluations in AxolotlBot.best_move
+
+
+def classify_hypotheses(hypotheses, color):
+    """
+    Sorts hypotheses into ones where we are checkmated, ones where we can capture the opponent king and ones that
+    need a search, in the same order of precedence. Both kings are checked with attack table lookups,
+    legal moves are only generated if our king is attacked.
+    Hypotheses without an opponent king are left out, the game would have ended if we captured it.
+    :param hypotheses: dictionary mapping fen strings to probability, with color to move
+    :param color: our color
+    :return: lists mated of probabilities, capturable of (opponent king square, probability) and search of
+    (fen, board, probability)
+    """
+    mated = []
+    capturable = []
+    search = []
+    for h, p in hypotheses.items():
+        board = chess.Board(h)
+        their_king = board.king(not color)
+        if their_king is None:
+            continue
+        if board.attackers_mask(not color, board.king(color)) and not any(board.generate_legal_moves()):
+            mated.append(p)
+        elif board.attackers_mask(color, their_king):
+            capturable.append((their_king, p))
+        else:
+            search.append((h, board, p))
+    return mated, capturable, search
+
+
+def relevant_squares(board, color, move_actions, graph):
+    """
+    :param board: board with our pieces
+    :param color: our color
+    :param move_actions: our candidate moves
+    :param graph: submove graph, see AxolotlBot.generate_submove_graph
+    :return: mask of the squares next to our king and on the paths of our candidate moves
+    """
+    mask = 0
+    king = board.king(color)
+    if king is not None:
+        mask |= chess.BB_SQUARES[king] | chess.BB_KING_ATTACKS[king]
+    for move in move_actions:
+        # the path of a move is the destinations of its chain of submoves
+        while move in graph and move:
+            mask |= chess.BB_SQUARES[move.to_square]
+            move = graph[move]
+        if move:
+            mask |= chess.BB_SQUARES[move.to_square]
+    return mask
+
+
+def cluster_signature(board, color, relevant):
+    """
+    :return: hashable summary of the pieces on the relevant squares, the opponent king and the opponent pieces attacking
+    the relevant squares from outside, equal for hypotheses that only differ in the placement of other opponent pieces
+    """
+    signature = [board.occupied_co[color] & relevant, board.pawns & relevant, board.knights & relevant,
+                 board.bishops & relevant, board.rooks & relevant, board.queens & relevant, board.kings & relevant,
+                 board.king(not color), board.castling_rights, board.ep_square]
+    for square in chess.scan_forward(board.occupied_co[not color] & ~relevant):
+        if board.attacks_mask(square) & relevant:
+            signature.append((square, board.piece_type_at(square)))
+    return tuple(signature)
+
+
+def cluster_hypotheses(search, color, relevant, budget, representatives=1):
+    """
+    Groups hypotheses with the same cluster_signature. In some groups only the most likely representatives are kept,
+    with the probability of the whole group spread over them in proportion. Groups are chosen in order of the least
+    probability per hypothesis left out, while the total probability of hypotheses left out is at most budget.
+    :param search: list of (fen, board, probability), as returned by classify_hypotheses
+    :param color: our color
+    :param relevant: mask of relevant squares, see relevant_squares
+    :param budget: largest total probability of hypotheses that are not evaluated themselves
+    :param representatives: number of hypotheses kept per group
+    :return: list of (fen, board, probability) to evaluate and number of hypotheses left out
+    """
+    clusters = {}
+    for item in search:
+        clusters.setdefault(cluster_signature(item[1], color, relevant), []).append(item)
+
+    candidates = []
+    for members in clusters.values():
+        if len(members) > representatives:
+            members.sort(key=lambda x: -x[2])
+            left_out = sum(p for h, board, p in members[representatives:])
+            candidates.append((left_out / (len(members) - representatives), left_out, id(members)))
+    candidates.sort()
+    merged = set()
+    spent = 0
+    for _, left_out, key in candidates:
+        if spent + left_out <= budget:
+            spent += left_out
+            merged.add(key)
+
+    result = []
+    count = 0
+    for members in clusters.values():
+        if id(members) in merged:
+            kept = members[:representatives]
+            total = sum(p for h, board, p in members)
+            kept_total = sum(p for h, board, p in kept)
+            scale = total / kept_total if kept_total > 0 else 1
+            result.extend((h, board, p * scale) for h, board, p in kept)
+            count += len(members) - len(kept)
+        else:
+            result.extend(members)
+    return result, count
+
+
+class EvaluationPlanner:
+    """
+    Collects the positions reached by every (hypothesis, move) pair of a turn before any are evaluated,
+    so each distinct position is sent to the engine only once.
+    """
+
+    def __init__(self):
+        self.positions = {}  # maps epd to board, for positions not scored yet
+        self.static_positions = {}  # maps epd to board, for positions only needing a static evaluation
+        self.scores = {}  # maps epd to score, for positions scored without the engine
+        self.requests = 0
+
+    def __len__(self):
+        """
+        :return: number of positions to evaluate with the engine
+        """
+        return len(self.positions)
+
+    def add(self, board, static=False):
+        """
+        :param board: position to evaluate, copied
+        :param static: if True, a static evaluation is enough, unless the position is also added without static
+        :return: key of the position in the scores returned by run
+        """
+        self.requests += 1
+        key = board.epd()
+        if key in self.positions or key in self.scores:
+            return key
+        if static:
+            if key not in self.static_positions:
+                self.static_positions[key] = board.copy(stack=False)
+        else:
+            if key in self.static_positions:
+                self.positions[key] = self.static_positions.pop(key)
+            else:
+                self.positions[key] = board.copy(stack=False)
+        return key
+
+    def avoided(self):
+        """
+        :return: number of evaluations saved by deduplication
+        """
+        return self.requests - len(self.positions) - len(self.static_positions) - len(self.scores)
+
+    def resolve(self, probe):
+        """
+        Scores positions without the engine where possible, e.g. with tablebases.
+        :param probe: function mapping a board to its score, or None if it can not be scored
+        :return: number of positions scored
+        """
+        count = 0
+        for positions in [self.positions, self.static_positions]:
+            for key, board in list(positions.items()):
+                score = probe(board)
+                if score is not None:
+                    self.scores[key] = score
+                    del positions[key]
+                    count += 1
+        return count
+
+    def run(self, evaluate, evaluate_static=None):
+        """
+        :param evaluate: function mapping a board to its score
+        :param evaluate_static: function mapping a list of boards to their scores, needed if static positions were added
+        :return: dictionary mapping keys of all positions to scores
+        """
+        scores = dict(self.scores)
+        if self.static_positions:
+            keys = list(self.static_positions)
+            scores.update(zip(keys, evaluate_static([self.static_positions[key] for key in keys])))
+        for key, board in self.positions.items():
+            scores[key] = evaluate(board)
+        return scores
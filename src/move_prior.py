@@ -0,0 +1,83 @@
+import json
+
+import chess
+
+# prior over opponent moves fit on saved games, see scripts/train_move_prior.py
+#
+# moves are grouped by piece type, rank of the from and to squares relative to the player, distance of the to square
+# from the edge of the board and move class. for each group, the table counts how often a move of the group was
+# available and how often it was requested, and the weight of a move is the ratio of the two, smoothed towards the
+# overall ratio so rarely seen groups are not ruled out.
+
+NULL, QUIET, CAPTURE, CASTLE, PROMOTION = range(5)
+MOVE_CLASSES = ["null", "quiet", "capture", "castle", "promotion"]
+TABLE_SIZE = 7 * 8 * 8 * 4 * len(MOVE_CLASSES)
+ALPHA = 10.0  # number of pseudo observations at the overall ratio added to every group
+
+
+def move_index(board, move):
+    """
+    :param board: board before move, with the player of move to move
+    :param move: move or None/chess.Move.null() for passing
+    :return: index of the group of move in the table
+    """
+    if not move:
+        return NULL
+    if board.is_castling(move):
+        move_class = CASTLE
+    elif move.promotion is not None:
+        move_class = PROMOTION
+    elif board.is_capture(move):
+        move_class = CAPTURE
+    else:
+        move_class = QUIET
+    piece_type = board.piece_type_at(move.from_square) or 0
+    from_rank = chess.square_rank(move.from_square)
+    to_rank = chess.square_rank(move.to_square)
+    if board.turn == chess.BLACK:
+        from_rank, to_rank = 7 - from_rank, 7 - to_rank
+    to_file = min(chess.square_file(move.to_square), 7 - chess.square_file(move.to_square))
+    return (((piece_type * 8 + from_rank) * 8 + to_rank) * 4 + to_file) * len(MOVE_CLASSES) + move_class
+
+
+class MovePrior:
+    def __init__(self, chosen=None, available=None):
+        self.chosen = [0] * TABLE_SIZE if chosen is None else chosen
+        self.available = [0] * TABLE_SIZE if available is None else available
+        self.weights = None
+
+    def observe(self, board, moves, requested_move):
+        """
+        Counts one decision of a player.
+        :param board: true board before the move
+        :param moves: moves the player could request, without the null move
+        :param requested_move: move the player requested, None for passing
+        """
+        for move in moves:
+            self.available[move_index(board, move)] += 1
+        self.available[NULL] += 1
+        self.chosen[move_index(board, requested_move)] += 1
+        self.weights = None
+
+    def weight(self, board, move):
+        """
+        :param board: board before move, with the player of move to move
+        :param move: move or chess.Move.null()
+        :return: unnormalized probability of the player choosing move
+        """
+        if self.weights is None:
+            base = (sum(self.chosen) + 1) / (sum(self.available) + 1)
+            self.weights = [(c + ALPHA * base) / (a + ALPHA) for c, a in zip(self.chosen, self.available)]
+        return self.weights[move_index(board, move)]
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"chosen": self.chosen, "available": self.available}, f)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            table = json.load(f)
+        if len(table["chosen"]) != TABLE_SIZE or len(table["available"]) != TABLE_SIZE:
+            raise Exception("move prior table has wrong size: " + path)
+        return cls(table["chosen"], table["available"])
@@ -0,0 +1,126 @@
+import hashlib
+import mmap
+import struct
+from array import array
+
+# precomputed decisions of AxolotlBot for early game beliefs, see scripts/build_opening_book.py
+#
+# every entry is keyed by the kind of decision, an observation (e.g. a capture square or sense result) and the belief
+# it was made from, hashed into a fixed width digest. layout (little endian):
+#   header
+#   index entries sorted by digest, so lookups are a binary search over the memory mapped file
+#   values, each pointed to by an offset and length in its index entry
+#
+# kinds of entries:
+#   "expand": belief after handle_opponent_move_result, observation is the capture square or empty
+#   "sense": square chosen by choose_sense
+#   "filter": belief after handle_sense_result, observation is the sense result string
+#   "move": uci of move chosen by choose_move, 0000 for the null move
+
+MAGIC = b"AXOB"
+VERSION = 1
+HEADER = struct.Struct("<4sHQ")  # magic, version, entry count
+ENTRY = struct.Struct("<16sQI")  # digest, value offset, value length
+DIGEST_SIZE = 16
+
+
+def belief_digest(hypotheses):
+    """
+    Hash of the set of hypotheses in a belief. Probabilities are not included, they are fixed by the set of hypotheses
+    when play starts from the standard position.
+    :param hypotheses: dictionary mapping fen strings to probability
+    :return: bytes
+    """
+    return hashlib.blake2b("\n".join(sorted(hypotheses)).encode("ascii"), digest_size=DIGEST_SIZE).digest()
+
+
+def entry_digest(kind, hypotheses, observation=""):
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    h.update(kind.encode("ascii") + b"\0" + observation.encode("ascii") + b"\0")
+    h.update(belief_digest(hypotheses))
+    return h.digest()
+
+
+def encode_belief(hypotheses):
+    """
+    :param hypotheses: dictionary mapping fen strings to probability
+    :return: bytes of count, probabilities (float64 each) and fen strings joined by newlines
+    """
+    return struct.pack("<Q", len(hypotheses)) + array("d", hypotheses.values()).tobytes() + "\n".join(hypotheses).encode("ascii")
+
+
+def decode_belief(value):
+    count, = struct.unpack_from("<Q", value, 0)
+    probabilities = array("d")
+    probabilities.frombytes(value[8:8 + 8 * count])
+    fens = value[8 + 8 * count:].decode("ascii").split("\n") if count > 0 else []
+    return dict(zip(fens, probabilities))
+
+
+class OpeningBook:
+    """
+    Read-only opening book backed by a memory mapped file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self.m, 0)
+        if magic != MAGIC or version != VERSION:
+            self.m.close()
+            raise Exception("not an opening book file: " + path)
+
+    def __len__(self):
+        return self.count
+
+    def get(self, kind, hypotheses, observation=""):
+        """
+        :param kind: kind of entry
+        :param hypotheses: belief the decision is made from
+        :param observation: observation the decision is made from, if any
+        :return: bytes of stored value or None if not in book
+        """
+        digest = entry_digest(kind, hypotheses, observation)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key, offset, length = ENTRY.unpack_from(self.m, HEADER.size + mid * ENTRY.size)
+            if key < digest:
+                lo = mid + 1
+            elif key > digest:
+                hi = mid
+            else:
+                return self.m[offset:offset + length]
+        return None
+
+    def close(self):
+        self.m.close()
+
+
+class OpeningBookWriter:
+    def __init__(self):
+        self.entries = {}  # maps digest to value
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, kind, hypotheses, value, observation=""):
+        """
+        :param kind: kind of entry
+        :param hypotheses: belief the decision is made from
+        :param value: bytes to store
+        :param observation: observation the decision is made from, if any
+        """
+        self.entries[entry_digest(kind, hypotheses, observation)] = value
+
+    def write(self, path):
+        keys = sorted(self.entries)
+        offset = HEADER.size + len(keys) * ENTRY.size
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(keys)))
+            for key in keys:
+                f.write(ENTRY.pack(key, offset, len(self.entries[key])))
+                offset += len(self.entries[key])
+            for key in keys:
+                f.write(self.entries[key])
@@ -0,0 +1,251 @@
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+# opt-in profiling of AxolotlBot callbacks, aggregated over all turns and games of the process
+# enabled by the AXOLOTL_PROFILE environment variable or the --profile flag of the scripts:
+#   cprofile: deterministic profile of every call, written as a pstats file per callback
+#   sample: stacks sampled every SAMPLE_INTERVAL seconds, with little overhead
+# both write collapsed stacks (one "frame;frame;... count" line per stack) for flame graph tools, rooted at the
+# callback name. cProfile does not record full stacks, so its collapsed stacks are one level deep (callback;function).
+#
+# memory accounting with tracemalloc is enabled separately, by the AXOLOTL_MEMORY environment variable or the --memory
+# flag of the scripts, and can be combined with either profiler. After every callback it logs traced, peak and retained
+# bytes next to the hypothesis counts, and keeps the top allocation sites at the highest traced memory of the process.
+
+PROFILE_ENV_VAR = "AXOLOTL_PROFILE"
+PROFILE_DIR_ENV_VAR = "AXOLOTL_PROFILE_DIR"
+MEMORY_ENV_VAR = "AXOLOTL_MEMORY"
+SAMPLE_INTERVAL = 0.005
+TOP_N = 20
+MEMORY_TOP_N = 10
+MB = 1 << 20
+
+profiler = None
+memory_tracker = None
+
+
+def frame_name(code):
+    return "{}:{}".format(os.path.basename(code.co_filename), code.co_name)
+
+
+class CProfileProfiler:
+    def __init__(self, directory):
+        self.directory = directory
+        self.stats = {}  # maps callback name to pstats.Stats
+        self.lock = threading.Lock()
+
+    def run(self, phase, fn, *args, **kwargs):
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(fn, *args, **kwargs)
+        finally:
+            with self.lock:
+                if phase in self.stats:
+                    self.stats[phase].add(profile)
+                else:
+                    self.stats[phase] = pstats.Stats(profile, stream=sys.stdout)
+
+    def report(self, top=TOP_N):
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, "profile.collapsed"), "w") as f:
+                for phase, stats in sorted(self.stats.items()):
+                    stats.dump_stats(os.path.join(self.directory, phase + ".pstats"))
+                    for (filename, line, name), (cc, nc, tt, ct, callers) in stats.stats.items():
+                        # self time in microseconds
+                        if int(tt * 1e6) > 0:
+                            f.write("{};{}:{} {}\n".format(phase, os.path.basename(filename), name, int(tt * 1e6)))
+            for phase, stats in sorted(self.stats.items()):
+                print("Profile of " + phase + ", top " + str(top) + " by own time:")
+                stats.sort_stats("tottime").print_stats(top)
+        print("Wrote profiles to " + self.directory)
+
+
+class SampleProfiler:
+    def __init__(self, directory, interval=SAMPLE_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.counts = {}  # maps collapsed stack to number of samples
+        self.active = {}  # maps thread id to (callback name, frame of run) for threads inside a callback
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def run(self, phase, fn, *args, **kwargs):
+        thread_id = threading.get_ident()
+        with self.lock:
+            self.active[thread_id] = (phase, sys._getframe())
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.sample, daemon=True)
+                self.thread.start()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self.lock:
+                del self.active[thread_id]
+
+    def sample(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, (phase, root) in self.active.items():
+                    frame = frames.get(thread_id)
+                    stack = []
+                    while frame is not None and frame is not root:
+                        stack.append(frame_name(frame.f_code))
+                        frame = frame.f_back
+                    key = ";".join([phase] + stack[::-1])
+                    self.counts[key] = self.counts.get(key, 0) + 1
+
+    def report(self, top=TOP_N):
+        with self.lock:
+            counts = dict(self.counts)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "profile.collapsed"), "w") as f:
+            for stack, count in sorted(counts.items()):
+                f.write("{} {}\n".format(stack, count))
+
+        total = sum(counts.values())
+        phases = {}
+        leaves = {}
+        for stack, count in counts.items():
+            frames = stack.split(";")
+            phases[frames[0]] = phases.get(frames[0], 0) + count
+            leaves[frames[-1]] = leaves.get(frames[-1], 0) + count
+        print("Profile: " + str(total) + " samples every " + str(self.interval) + "s")
+        for phase, count in sorted(phases.items(), key=lambda x: -x[1]):
+            print("{:>8.1%} {}".format(count / total, phase))
+        print("Top " + str(top) + " by own samples:")
+        for leaf, count in sorted(leaves.items(), key=lambda x: -x[1])[:top]:
+            print("{:>8.1%} {}".format(count / total, leaf))
+        print("Wrote profiles to " + self.directory)
+
+
+class MemoryTracker:
+    def __init__(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.phases = {}  # maps callback name to [calls, max peak, total retained, max retained] in bytes
+        self.high = 0  # highest traced memory after a callback
+        self.sites = []  # top allocation sites at that point
+        self.lock = threading.Lock()
+
+    def run(self, phase, fn, *args, **kwargs):
+        with self.lock:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            retained = current - before
+            with self.lock:
+                stats = self.phases.setdefault(phase, [0, 0, 0, 0])
+                stats[0] += 1
+                stats[1] = max(stats[1], peak)
+                stats[2] += retained
+                stats[3] = max(stats[3], retained)
+                if current > self.high:
+                    self.high = current
+                    self.sites = tracemalloc.take_snapshot().statistics("lineno")[:MEMORY_TOP_N]
+
+            # the bot is the first argument of callbacks
+            hypotheses = getattr(args[0], "hypotheses", None) if args else None
+            line = "Memory after {}: {:.1f} MB traced, peak {:.1f} MB, retained {:+.1f} MB".format(
+                phase, current / MB, peak / MB, retained / MB)
+            if hypotheses:
+                line += ", " + str(current // len(hypotheses)) + " bytes per hypothesis"
+            print(line)
+
+    def report(self, top=MEMORY_TOP_N):
+        with self.lock:
+            print("Memory by callback (MB): calls, max peak, mean retained, max retained")
+            for phase, (calls, peak, retained, max_retained) in sorted(self.phases.items()):
+                print("{:<28} {:>6} {:>10.1f} {:>+10.2f} {:>+10.2f}".format(phase, calls, peak / MB, retained / calls / MB, max_retained / MB))
+            print("Top " + str(top) + " allocation sites at " + "{:.1f}".format(self.high / MB) + " MB traced:")
+            for stat in self.sites[:top]:
+                print("{:>10.1f} MB {}".format(stat.size / MB, stat.traceback))
+
+
+def current_bytes():
+    """
+    :return: traced memory if memory accounting is enabled, else resident memory of the process, or None if unknown
+    """
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def enable_memory(frames=1):
+    """
+    Tracks memory of all callbacks decorated with profile_phase from now on.
+    :param frames: number of frames stored per allocation site
+    """
+    global memory_tracker
+    memory_tracker = MemoryTracker(frames)
+    print("Tracking memory")
+
+
+def enable(mode, directory=None):
+    """
+    Profiles all callbacks decorated with profile_phase from now on.
+    :param mode: "cprofile" or "sample"
+    :param directory: directory to write profiles to
+    """
+    global profiler
+    if directory is None:
+        directory = os.environ.get(PROFILE_DIR_ENV_VAR, "profiles")
+    if mode == "cprofile":
+        profiler = CProfileProfiler(directory)
+    elif mode == "sample":
+        profiler = SampleProfiler(directory)
+    else:
+        raise Exception("unknown profiler: " + mode)
+    print("Profiling with " + mode)
+
+
+def report():
+    """
+    Writes the profiles collected so far and prints a summary of hotspots, if profiling is enabled,
+    and a summary of memory use if memory accounting is enabled.
+    """
+    if profiler is not None:
+        profiler.report()
+    if memory_tracker is not None:
+        memory_tracker.report()
+
+
+def profile_phase(fn):
+    """
+    Decorator for callbacks, which are profiled and tracked under their name if profiling or memory accounting is enabled.
+    """
+    phase = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if profiler is None and memory_tracker is None:
+            return fn(*args, **kwargs)
+        call = fn
+        if profiler is not None:
+            call = functools.partial(profiler.run, phase, call)
+        if memory_tracker is not None:
+            call = functools.partial(memory_tracker.run, phase, call)
+        return call(*args, **kwargs)
+
+    return wrapper
+
+
+if PROFILE_ENV_VAR in os.environ:
+    enable(os.environ[PROFILE_ENV_VAR])
+if MEMORY_ENV_VAR in os.environ:
+    enable_memory(int(os.environ[MEMORY_ENV_VAR] or 1))
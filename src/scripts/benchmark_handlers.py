@@ -0,0 +1,170 @@
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import random
+import subprocess
+import time
+
+import chess
+from reconchess.utilities import move_actions, revise_move, capture_square_of_move, add_pawn_queen_promotion
+
+from axolotl import AxolotlBot
+from scripts.synthetic_belief import generate_belief
+
+# microbenchmarks of AxolotlBot handlers on synthetic beliefs of increasing size
+
+
+def make_bot(color, friendly_board, hypotheses):
+    bot = AxolotlBot()
+    bot.color = color
+    bot.friendly_board = friendly_board.copy()
+    bot.hypotheses = dict(hypotheses)
+    return bot
+
+
+def sense_result_of(board, square):
+    # code for sense from reconchess.LocalGame
+    rank, file = chess.square_rank(square), chess.square_file(square)
+    sense_result = []
+    for delta_rank in [1, 0, -1]:
+        for delta_file in [-1, 0, 1]:
+            if 0 <= rank + delta_rank <= 7 and 0 <= file + delta_file <= 7:
+                sense_square = chess.square(file + delta_file, rank + delta_rank)
+                sense_result.append((sense_square, board.piece_at(sense_square)))
+    return sense_result
+
+
+def setup_choose_sense(bot, truth, rng):
+    return lambda: bot.choose_sense(list(chess.SQUARES), [], 900)
+
+
+def setup_handle_sense_result(bot, truth, rng):
+    bot.sense = rng.choice([8 * i + j for i in range(1, 7) for j in range(1, 7)])
+    sense_result = sense_result_of(truth, bot.sense)
+    return lambda: bot.handle_sense_result(sense_result)
+
+
+def setup_handle_opponent_move_result(bot, truth, rng):
+    # pass our turn so it is the opponent's turn in every hypothesis
+    bot.handle_move_result(None, None, False, None)
+    return lambda: bot.handle_opponent_move_result(False, None)
+
+
+def setup_handle_move_result(bot, truth, rng):
+    requested_move = rng.choice(move_actions(truth))
+    taken_move = revise_move(truth, add_pawn_queen_promotion(truth, requested_move))
+    capture_square = capture_square_of_move(truth, taken_move)
+    return lambda: bot.handle_move_result(requested_move, taken_move, capture_square is not None, capture_square)
+
+
+def setup_check_friendly_pieces(bot, truth, rng):
+    return bot.check_friendly_pieces
+
+
+def setup_validate_friendly_pieces(bot, truth, rng):
+    return bot.validate_friendly_pieces
+
+
+BENCHMARKS = {
+    'choose_sense': setup_choose_sense,
+    'handle_sense_result': setup_handle_sense_result,
+    'handle_opponent_move_result': setup_handle_opponent_move_result,
+    'handle_move_result': setup_handle_move_result,
+    'check_friendly_pieces': setup_check_friendly_pieces,
+    'validate_friendly_pieces': setup_validate_friendly_pieces,
+}
+
+
+def run_benchmark(name, color, friendly_board, hypotheses, repeat=3, seed=0):
+    """
+    Times one handler on a copy of the belief.
+    :return: best time in seconds over repeat runs
+    """
+    rng = random.Random(seed)
+    truth = chess.Board(rng.choice(list(hypotheses)))
+    best = None
+    for _ in range(repeat):
+        bot = make_bot(color, friendly_board, hypotheses)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            fn = BENCHMARKS[name](bot, truth, random.Random(seed))
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def load_belief(fen, color, size, seed, cache_dir=None):
+    """
+    Generates a belief with generate_belief, reusing a copy saved in cache_dir by an earlier run if there is one.
+    """
+    if cache_dir is None:
+        return generate_belief(chess.Board(fen), color, size, seed=seed)
+
+    name = '{}-{}-{}-{}.json'.format(fen.replace('/', '_').replace(' ', '_'), chess.COLOR_NAMES[color], size, seed)
+    path = os.path.join(cache_dir, name)
+    if os.path.exists(path):
+        with open(path) as f:
+            friendly_fen, hypotheses = json.load(f)
+        return chess.Board(friendly_fen), hypotheses
+
+    friendly_board, hypotheses = generate_belief(chess.Board(fen), color, size, seed=seed)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump([friendly_board.fen(), hypotheses], f)
+    return friendly_board, hypotheses
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--sizes', default=[100, 1000, 10000, 100000, 1000000], type=int, nargs='+', help='belief sizes to benchmark.')
+    parser.add_argument('--handlers', default=list(BENCHMARKS), choices=list(BENCHMARKS), nargs='+', help='handlers to benchmark.')
+    parser.add_argument('--fen', default=chess.STARTING_FEN, help='starting position of the generated beliefs.')
+    parser.add_argument('--color', default='white', choices=['white', 'black'], help='color of the bot.')
+    parser.add_argument('--seed', default=0, type=int, help='random seed for belief generation and handler inputs.')
+    parser.add_argument('--repeat', default=3, type=int, help='number of runs per measurement, the best is reported.')
+    parser.add_argument('--max_seconds', default=60, type=float, help='skip larger sizes of a handler once a run takes longer than this.')
+    parser.add_argument('--cache_dir', default=None, help='directory to save generated beliefs in and reuse them from.')
+    parser.add_argument('--output', default=None, help='json lines file to append results to, for tracking across commits.')
+    args = parser.parse_args()
+
+    color = chess.WHITE if args.color == 'white' else chess.BLACK
+    commit = current_commit()
+    timestamp = datetime.datetime.now().strftime('%Y_%m_%d-%H_%M_%S')
+    too_slow = set()
+    results = []
+
+    print('{:<28} {:>9} {:>12} {:>16}'.format('handler', 'size', 'seconds', 'hypotheses/s'))
+    for size in sorted(args.sizes):
+        friendly_board, hypotheses = load_belief(args.fen, color, size, args.seed, args.cache_dir)
+        for name in args.handlers:
+            if name in too_slow:
+                continue
+            seconds = run_benchmark(name, color, friendly_board, hypotheses, repeat=args.repeat, seed=args.seed)
+            throughput = len(hypotheses) / seconds if seconds > 0 else float('inf')
+            print('{:<28} {:>9} {:>12.6f} {:>16.0f}'.format(name, len(hypotheses), seconds, throughput))
+            results.append({'commit': commit, 'timestamp': timestamp, 'handler': name, 'size': len(hypotheses),
+                            'seconds': seconds, 'throughput': throughput})
+            if seconds > args.max_seconds:
+                too_slow.add(name)
+
+    if args.output is not None:
+        with open(args.output, 'a') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+        print('Appended results to {}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ import random
 import chess
 from reconchess import load_player, LocalGame
 from scripts.play_debug import play_local_game
+import profiling
 
 # modification of reconchess.scripts.rc_bot_match for debugging
 
@@ -13,8 +14,17 @@ def main():
     parser.add_argument('bot1_path', help='path to first bot source file')
     parser.add_argument('bot2_path', help='path to second bot source file')
     parser.add_argument('--seconds_per_player', default=900, type=float, help='number of seconds each player has to play the entire game.')
+    parser.add_argument('--check_rate', default=1.0, type=float, help='fraction of hypotheses checked against the true board after every phase, 0 to disable checks.')
+    parser.add_argument('--profile', default=None, choices=['cprofile', 'sample'], help='profile the callbacks of AxolotlBot.')
+    parser.add_argument('--profile_dir', default='profiles', help='directory to write profiles to.')
+    parser.add_argument('--memory', action='store_true', help='track memory of the callbacks of AxolotlBot with tracemalloc.')
     args = parser.parse_args()
 
+    if args.profile is not None:
+        profiling.enable(args.profile, args.profile_dir)
+    if args.memory:
+        profiling.enable_memory()
+
     if random.randint(0, 1) == 0:
         white_bot_name, white_player_cls = load_player(args.bot1_path)
         black_bot_name, black_player_cls = load_player(args.bot2_path)
@@ -24,7 +34,7 @@ def main():
 
     game = LocalGame(args.seconds_per_player)
 
-    winner_color, win_reason, history = play_local_game(white_player_cls(), black_player_cls(), game=game)
+    winner_color, win_reason, history = play_local_game(white_player_cls(), black_player_cls(), game=game, check_rate=args.check_rate)
 
     winner = 'Draw' if winner_color is None else chess.COLOR_NAMES[winner_color]
 
@@ -1,13 +1,21 @@
 import argparse
 import datetime
+import multiprocessing
+import multiprocessing.util
 import traceback
 import chess
 import os
 from reconchess import load_player, LocalGame
 from scripts.play_debug import play_local_game
+from axolotl import AxolotlBot
+from engine_pool import EnginePool
+from shared_belief import START_METHOD
+import profiling
 
 
 # modification of reconchess.scripts.rc_bot_match for running multiples bot games
+# with --workers, games are played by long-lived worker processes that import the bots and start an engine once,
+# and reuse each AxolotlBot across games through AxolotlBot.reset
 
 
 def main():
@@ -16,35 +24,50 @@ def main():
     parser.add_argument('bot2_path', help='path to second bot source file')
     parser.add_argument('number_of_games', type=int, help='number of games bots have to play for each color')
     parser.add_argument('--seconds_per_player', default=900, type=float, help='number of seconds each player has to play the entire game.')
+    parser.add_argument('--check_rate', default=1.0, type=float, help='fraction of hypotheses checked against the true board after every phase, 0 to disable checks.')
+    parser.add_argument('--profile', default=None, choices=['cprofile', 'sample'], help='profile the callbacks of AxolotlBot.')
+    parser.add_argument('--profile_dir', default='profiles', help='directory to write profiles to.')
+    parser.add_argument('--memory', action='store_true', help='track memory of the callbacks of AxolotlBot with tracemalloc.')
+    parser.add_argument('--workers', default=0, type=int, help='number of warm worker processes playing games concurrently, 0 to play games one by one in this process.')
     args = parser.parse_args()
+
+    if args.profile is not None:
+        profiling.enable(args.profile, args.profile_dir)
+    if args.memory:
+        profiling.enable_memory()
     n = int(args.number_of_games)
     bot1_wins = 0
     bot2_wins = 0
     draws = 0
     errors = 0
 
+    games = []  # list of (white bot path, black bot path), alternating colors
     for i in range(n):
-        winner = play(args.bot1_path, args.bot2_path, args.seconds_per_player)
-
-        if winner == "white":
-            bot1_wins += 1
-        elif winner == "black":
-            bot2_wins += 1
-        elif winner == "Draw":
+        games.append((args.bot1_path, args.bot2_path))
+        games.append((args.bot2_path, args.bot1_path))
+
+    if args.workers > 0:
+        pool = multiprocessing.get_context(START_METHOD).Pool(args.workers, initializer=init_worker,
+                                                               initargs=(args.profile, args.profile_dir, args.memory))
+        try:
+            winners = pool.starmap(play_warm, [(white, black, args.seconds_per_player, args.check_rate) for white, black in games],
+                                   chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        winners = [play(white, black, args.seconds_per_player, args.check_rate) for white, black in games]
+
+    for i, winner in enumerate(winners):
+        # bot1 is white in even games
+        if winner == "Draw":
             draws += 1
-        else:
+        elif winner not in ["white", "black"]:
             errors += 1
-
-        winner = play(args.bot2_path, args.bot1_path, args.seconds_per_player)
-
-        if winner == "white":
-            bot2_wins += 1
-        elif winner == "black":
+        elif (winner == "white") == (i % 2 == 0):
             bot1_wins += 1
-        elif winner == "Draw":
-            draws += 1
         else:
-            errors += 1
+            bot2_wins += 1
 
     print("\n\nResults:")
     print(os.path.split(args.bot1_path)[1] +  " wins: " + str(bot1_wins))
@@ -53,14 +76,58 @@ def main():
     print("Errors: " + str(errors))
 
 
-def play(bot1_path, bot2_path, seconds_per_player):
+def play(bot1_path, bot2_path, seconds_per_player, check_rate=1.0):
     white_bot_name, white_player_cls = load_player(bot1_path)
     black_bot_name, black_player_cls = load_player(bot2_path)
 
+    return play_game(white_bot_name, white_player_cls(), black_bot_name, black_player_cls(), seconds_per_player, check_rate)
+
+
+# state of a worker process
+worker_players = {}  # maps (bot path, color) to (bot name, player) for players reused across games
+worker_engine_pool = None
+
+
+def init_worker(profile=None, profile_dir='profiles', memory=False):
+    global worker_engine_pool
+    worker_engine_pool = EnginePool(1)
+    # quit the engine when the pool is closed
+    multiprocessing.util.Finalize(None, worker_engine_pool.quit, exitpriority=10)
+    if profile is not None:
+        profiling.enable(profile, os.path.join(profile_dir, str(os.getpid())))
+    if memory:
+        profiling.enable_memory()
+
+
+def warm_player(path, color):
+    """
+    :return: name and player for path in a worker process, an AxolotlBot kept from the last game if there is one
+    """
+    key = (path, color)
+    if key in worker_players:
+        name, player = worker_players[key]
+        player.reset()
+        return name, player
+    name, cls = load_player(path)
+    if not issubclass(cls, AxolotlBot):
+        return name, cls()
+    player = cls(engine_pool=worker_engine_pool)
+    worker_players[key] = (name, player)
+    return name, player
+
+
+def play_warm(bot1_path, bot2_path, seconds_per_player, check_rate=1.0):
+    white_bot_name, white_player = warm_player(bot1_path, chess.WHITE)
+    black_bot_name, black_player = warm_player(bot2_path, chess.BLACK)
+
+    return play_game(white_bot_name, white_player, black_bot_name, black_player, seconds_per_player, check_rate)
+
+
+def play_game(white_bot_name, white_player, black_bot_name, black_player, seconds_per_player, check_rate=1.0):
     game = LocalGame(seconds_per_player)
 
     try:
-        winner_color, win_reason, history = play_local_game(white_player_cls(), black_player_cls(), game=game)
+        winner_color, win_reason, history = play_local_game(white_player, black_player, game=game, check_rate=check_rate)
 
         winner = 'Draw' if winner_color is None else chess.COLOR_NAMES[winner_color]
     except:
@@ -0,0 +1,162 @@
+import argparse
+import contextlib
+import os
+
+import chess
+from reconchess.utilities import move_actions, revise_move, capture_square_of_move, add_pawn_queen_promotion
+
+from axolotl import AxolotlBot
+from opening_book import OpeningBookWriter, encode_belief
+from scripts.benchmark_handlers import sense_result_of
+
+# offline builder of the opening book, see opening_book.py
+# enumerates every observation AxolotlBot can receive from the standard starting position up to a number of plies,
+# and stores the decisions the bot makes live in each node of the tree
+
+
+def branch(bot):
+    """
+    Returns a copy of bot sharing its engine.
+    Handlers replace bot.hypotheses instead of modifying it, so the dictionary is not copied.
+    """
+    copy = AxolotlBot(bot.engine_pool)
+    copy.color = bot.color
+    copy.friendly_board = bot.friendly_board.copy()
+    copy.hypotheses = bot.hypotheses
+    copy.sense = bot.sense
+    copy.move = bot.move
+    copy.engine = bot.engine
+    copy.move_prior = bot.move_prior
+    return copy
+
+
+def quiet(fn, *args):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return fn(*args)
+
+
+def opponent_capture_squares(bot):
+    """
+    :return: squares of our pieces the opponent can capture in some hypothesis
+    """
+    friendly = bot.friendly_board.occupied_co[bot.color]
+    squares = set()
+    for h in bot.hypotheses:
+        for move in chess.Board(h).generate_pseudo_legal_captures(to_mask=friendly):
+            squares.add(move.to_square)
+    return sorted(squares)
+
+
+def build_turn(bot, book, ply, plies, mass, min_mass):
+    """
+    Adds the decisions of bot in its turn at ply and all following turns before plies to book.
+    :param bot: AxolotlBot at the start of its turn, before handle_opponent_move_result
+    :param book: OpeningBookWriter
+    :param ply: index of the ply of our move, starting from 0 for white's first move
+    :param plies: number of plies to build
+    :param mass: probability of reaching this turn
+    :param min_mass: branches with lower probability are skipped
+    """
+    if ply >= plies or mass < min_mass:
+        return
+
+    # opponent move results
+    if bot.friendly_board.turn == bot.color:
+        # first turn of white, no opponent move
+        observations = [(bot, 1.0)]
+    else:
+        observations = []
+        for capture_square in [None] + opponent_capture_squares(bot):
+            child = branch(bot)
+            quiet(child.handle_opponent_move_result, capture_square is not None, capture_square)
+            # expansion is not normalized, the total is the probability of the observation
+            p = sum(child.hypotheses.values())
+            if p == 0:
+                continue
+            book.add("expand", bot.hypotheses, encode_belief(child.hypotheses), "" if capture_square is None else str(capture_square))
+            observations.append((child, p))
+
+    for child, p in observations:
+        if mass * p < min_mass:
+            continue
+        build_sense(child, book, ply, plies, mass * p, min_mass)
+
+
+def build_sense(bot, book, ply, plies, mass, min_mass):
+    tot = sum(bot.hypotheses.values())
+    sense = quiet(bot.choose_sense, list(chess.SQUARES), [], 900)
+    book.add("sense", bot.hypotheses, bytes([sense]))
+
+    # group hypotheses by sense result
+    results = {}
+    for h, p in bot.hypotheses.items():
+        result = bot.sense_expanded_fen(bot.expand_fen(h), sense)
+        if result in results:
+            results[result] = (results[result][0], results[result][1] + p)
+        else:
+            results[result] = (h, p)
+
+    for result, (h, p) in results.items():
+        if mass * p / tot < min_mass:
+            continue
+        child = branch(bot)
+        quiet(child.handle_sense_result, sense_result_of(chess.Board(h), sense))
+        book.add("filter", bot.hypotheses, encode_belief(child.hypotheses), result)
+        build_move(child, book, ply, plies, mass * p / tot, min_mass)
+
+
+def build_move(bot, book, ply, plies, mass, min_mass):
+    print("Ply {} ({:.4f}): {} hypotheses, {} entries".format(ply, mass, len(bot.hypotheses), len(book)))
+    actions = move_actions(chess.Board(next(iter(bot.hypotheses))))
+    requested_move = quiet(bot.choose_move, list(actions), 900)
+    book.add("move", bot.hypotheses, bot.move.uci().encode("ascii"))
+
+    # group hypotheses by move result
+    results = {}
+    for h, p in bot.hypotheses.items():
+        board = chess.Board(h)
+        if requested_move is None:
+            taken_move = None
+        else:
+            taken_move = revise_move(board, add_pawn_queen_promotion(board, requested_move))
+        capture_square = None if taken_move is None else capture_square_of_move(board, taken_move)
+        results[(taken_move, capture_square)] = results.get((taken_move, capture_square), 0) + p
+
+    for (taken_move, capture_square), p in results.items():
+        child = branch(bot)
+        quiet(child.handle_move_result, requested_move, taken_move, capture_square is not None, capture_square)
+        build_turn(child, book, ply + 2, plies, mass * p, min_mass)
+
+
+def build(colors, plies, min_mass):
+    """
+    :param colors: colors to build the book for
+    :param plies: number of plies from the starting position
+    :param min_mass: branches with lower probability are skipped
+    :return: OpeningBookWriter
+    """
+    book = OpeningBookWriter()
+    for color in colors:
+        bot = AxolotlBot()
+        quiet(bot.handle_game_start, color, chess.Board(), "opening book")
+        build_turn(bot, book, 0 if color == chess.WHITE else 1, plies, 1.0, min_mass)
+        bot.engine.quit()
+    return book
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('output', help='path of opening book file to write.')
+    parser.add_argument('--plies', default=4, type=int, help='number of plies from the starting position to build.')
+    parser.add_argument('--min_mass', default=0.01, type=float, help='skip branches reached with lower probability.')
+    parser.add_argument('--color', default='both', choices=['white', 'black', 'both'], help='color of the bot.')
+    args = parser.parse_args()
+
+    colors = {'white': [chess.WHITE], 'black': [chess.BLACK], 'both': [chess.WHITE, chess.BLACK]}[args.color]
+    book = build(colors, args.plies, args.min_mass)
+    book.write(args.output)
+    print('Wrote {} entries to {}'.format(len(book), args.output))
+
+
+if __name__ == '__main__':
+    main()
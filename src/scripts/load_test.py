@@ -0,0 +1,190 @@
+import argparse
+import concurrent.futures
+import contextlib
+import datetime
+import json
+import math
+import os
+import random
+import time
+import traceback
+
+import chess
+from reconchess import load_player, play_local_game, LocalGame, Player
+
+# load test of many concurrent LocalGames, for throughput (games per hour) and tail latency of the callbacks
+# each configuration is a number of concurrent games, played by a pool of that many processes
+
+CALLBACKS = ['handle_game_start', 'handle_opponent_move_result', 'choose_sense', 'handle_sense_result', 'choose_move',
+             'handle_move_result', 'handle_game_end']
+PERCENTILES = [50, 95, 99]
+
+
+class TimedPlayer(Player):
+    """
+    Wraps a :class:`Player` and records the latency of every callback and the seconds left at every choice.
+    """
+
+    def __init__(self, player: Player):
+        self.player = player
+        self.latencies = {name: [] for name in CALLBACKS}  # maps callback name to list of seconds
+        self.seconds_left = []  # (callback name, seconds left) for every choose_sense and choose_move
+
+    def timed(self, name, *args):
+        start = time.perf_counter()
+        try:
+            return getattr(self.player, name)(*args)
+        finally:
+            self.latencies[name].append(time.perf_counter() - start)
+
+    def handle_game_start(self, color, board, opponent_name):
+        self.timed('handle_game_start', color, board, opponent_name)
+
+    def handle_opponent_move_result(self, captured_my_piece, capture_square):
+        self.timed('handle_opponent_move_result', captured_my_piece, capture_square)
+
+    def choose_sense(self, sense_actions, move_actions, seconds_left):
+        self.seconds_left.append(('choose_sense', seconds_left))
+        return self.timed('choose_sense', sense_actions, move_actions, seconds_left)
+
+    def handle_sense_result(self, sense_result):
+        self.timed('handle_sense_result', sense_result)
+
+    def choose_move(self, move_actions, seconds_left):
+        self.seconds_left.append(('choose_move', seconds_left))
+        return self.timed('choose_move', move_actions, seconds_left)
+
+    def handle_move_result(self, requested_move, taken_move, captured_opponent_piece, capture_square):
+        self.timed('handle_move_result', requested_move, taken_move, captured_opponent_piece, capture_square)
+
+    def handle_game_end(self, winner_color, win_reason, game_history):
+        self.timed('handle_game_end', winner_color, win_reason, game_history)
+
+
+def play(white_path, black_path, seed, seconds_per_player, full_turn_limit=None, quiet=True):
+    """
+    Plays one game in this process with the random module seeded, so the game can be replayed with the same seed
+    (up to engine and timing differences).
+    :return: dictionary of the result, callback latencies and seconds left trajectories by color name
+    """
+    random.seed(seed)
+    white_name, white_cls = load_player(white_path)
+    black_name, black_cls = load_player(black_path)
+    players = {chess.WHITE: TimedPlayer(white_cls()), chess.BLACK: TimedPlayer(black_cls())}
+    game = LocalGame(seconds_per_player, full_turn_limit=full_turn_limit)
+
+    start = time.perf_counter()
+    result = {'seed': seed, 'white': white_name, 'black': black_name, 'winner': None, 'win_reason': None, 'error': None}
+    try:
+        with contextlib.ExitStack() as stack:
+            if quiet:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+            winner_color, win_reason, history = play_local_game(players[chess.WHITE], players[chess.BLACK], game=game)
+        result['winner'] = 'Draw' if winner_color is None else chess.COLOR_NAMES[winner_color]
+        result['win_reason'] = None if win_reason is None else win_reason.name
+    except:
+        result['error'] = traceback.format_exc()
+        game.end()
+
+    result['seconds'] = time.perf_counter() - start
+    result['moves'] = sum(len(player.latencies['choose_move']) for player in players.values())
+    result['latencies'] = {chess.COLOR_NAMES[color]: player.latencies for color, player in players.items()}
+    result['seconds_left'] = {chess.COLOR_NAMES[color]: player.seconds_left for color, player in players.items()}
+    result['final_seconds_left'] = {chess.COLOR_NAMES[color]: game.seconds_left_by_color[color] for color in chess.COLORS}
+    return result
+
+
+def percentile(values, p):
+    """
+    :return: p-th percentile of values by the nearest rank method
+    """
+    values = sorted(values)
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+def run_configuration(bot_paths, number_of_games, concurrency, seed, seconds_per_player, full_turn_limit=None, quiet=True):
+    """
+    Plays number_of_games games for each color assignment of the bots, at most concurrency at a time.
+    :return: list of game results from :func:`play`, and the wall clock seconds taken
+    """
+    games = []
+    for i in range(number_of_games):
+        games.append((bot_paths[0], bot_paths[1], seed + 2 * i))
+        games.append((bot_paths[1], bot_paths[0], seed + 2 * i + 1))
+
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(concurrency) as executor:
+        futures = [executor.submit(play, white, black, game_seed, seconds_per_player, full_turn_limit, quiet)
+                   for white, black, game_seed in games]
+        results = [future.result() for future in futures]
+    return results, time.perf_counter() - start
+
+
+def summarize(results, wall_seconds, concurrency):
+    """
+    :return: dictionary of throughput, errors, time usage and latency percentiles per bot and callback
+    """
+    summary = {'concurrency': concurrency, 'games': len(results), 'wall_seconds': wall_seconds,
+               'games_per_hour': 3600 * len(results) / wall_seconds, 'errors': sum(r['error'] is not None for r in results),
+               'bots': {}}
+    for r in results:
+        for color_name in chess.COLOR_NAMES:
+            bot = summary['bots'].setdefault(r[color_name], {'latencies': {}, 'final_seconds_left': []})
+            for name, latencies in r['latencies'][color_name].items():
+                bot['latencies'].setdefault(name, []).extend(latencies)
+            bot['final_seconds_left'].append(r['final_seconds_left'][color_name])
+
+    for bot in summary['bots'].values():
+        bot['latencies'] = {name: {'count': len(latencies), 'max': max(latencies),
+                                   **{'p' + str(p): percentile(latencies, p) for p in PERCENTILES}}
+                            for name, latencies in bot['latencies'].items() if latencies}
+        final = bot.pop('final_seconds_left')
+        bot['min_final_seconds_left'] = min(final)
+        bot['median_final_seconds_left'] = percentile(final, 50)
+    return summary
+
+
+def print_summary(summary):
+    print('\nConcurrency {}: {} games in {:.1f} seconds, {:.1f} games per hour, {} errors'.format(
+        summary['concurrency'], summary['games'], summary['wall_seconds'], summary['games_per_hour'], summary['errors']))
+    for name, bot in summary['bots'].items():
+        print('{}: final seconds left median {:.1f}, min {:.1f}'.format(name, bot['median_final_seconds_left'], bot['min_final_seconds_left']))
+        print('  {:<28} {:>7} {:>9} {:>9} {:>9} {:>9}'.format('callback', 'count', 'p50', 'p95', 'p99', 'max'))
+        for callback, latency in bot['latencies'].items():
+            print('  {:<28} {:>7} {:>9.4f} {:>9.4f} {:>9.4f} {:>9.4f}'.format(callback, latency['count'], latency['p50'],
+                                                                          latency['p95'], latency['p99'], latency['max']))
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('bot1_path', help='path to first bot source file')
+    parser.add_argument('bot2_path', help='path to second bot source file, the same as the first for self-play')
+    parser.add_argument('number_of_games', type=int, help='number of games bots have to play for each color, per configuration')
+    parser.add_argument('--concurrency', default=[1], type=int, nargs='+', help='numbers of concurrent games, one configuration each.')
+    parser.add_argument('--seed', default=0, type=int, help='random seed of the first game, the others use the following seeds.')
+    parser.add_argument('--seconds_per_player', default=900, type=float, help='number of seconds each player has to play the entire game.')
+    parser.add_argument('--full_turn_limit', default=None, type=int, help='end games as draws after this many full turns.')
+    parser.add_argument('--verbose', action='store_true', help='show the output of the bots.')
+    parser.add_argument('--output', default=None, help='json lines file to append summaries and game results to.')
+    args = parser.parse_args()
+
+    timestamp = datetime.datetime.now().strftime('%Y_%m_%d-%H_%M_%S')
+    for concurrency in args.concurrency:
+        results, wall_seconds = run_configuration([args.bot1_path, args.bot2_path], args.number_of_games, concurrency,
+                                                  args.seed, args.seconds_per_player, args.full_turn_limit, not args.verbose)
+        summary = summarize(results, wall_seconds, concurrency)
+        print_summary(summary)
+        for r in results:
+            if r['error'] is not None:
+                print('Error in game with seed {}:\n{}'.format(r['seed'], r['error']))
+
+        if args.output is not None:
+            with open(args.output, 'a') as f:
+                f.write(json.dumps({'type': 'summary', 'timestamp': timestamp, **summary}) + '\n')
+                for r in results:
+                    f.write(json.dumps({'type': 'game', 'timestamp': timestamp, 'concurrency': concurrency, **r}) + '\n')
+            print('Appended results to {}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
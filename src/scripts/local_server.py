@@ -0,0 +1,237 @@
+import itertools
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import chess
+import reconchess
+from reconchess import LocalGame, Player, ChessJSONDecoder, GameHistoryEncoder
+from reconchess.play import play_turn
+
+# stand-in for the reconchess server, for testing remote clients locally
+
+
+class ServerGame:
+    """
+    A :class:`LocalGame` between a remote player connecting over HTTP and a local opponent played in a background thread.
+    """
+
+    def __init__(self, game_id, color, opponent: Player, seconds_per_player=900, full_turn_limit=None):
+        self.game_id = game_id
+        self.color = color  # color of the remote player
+        self.opponent = opponent
+        self.game = LocalGame(seconds_per_player, full_turn_limit=full_turn_limit)
+        self.condition = threading.Condition()
+        self.started = False
+        self.finished = False
+
+        white_name, black_name = 'remote', opponent.__class__.__name__
+        if not color:
+            white_name, black_name = black_name, white_name
+        self.game.store_players(white_name, black_name)
+        opponent.handle_game_start(not color, self.game.board.copy(), 'remote')
+
+        self.thread = threading.Thread(target=self.play_opponent, daemon=True)
+        self.thread.start()
+
+    def start(self):
+        with self.condition:
+            if not self.started:
+                self.game.start()
+                self.started = True
+                self.condition.notify_all()
+
+    def finish_if_over(self):
+        """
+        Ends the game if it is over. Must be called while holding self.condition.
+        """
+        if not self.finished and self.started and self.game.is_over():
+            self.game.end()
+            self.finished = True
+            self.condition.notify_all()
+
+    def is_my_turn(self):
+        return self.started and not self.game.is_over() and self.game.turn == self.color
+
+    def play_opponent(self):
+        with self.condition:
+            while not self.finished:
+                self.condition.wait_for(lambda: self.finished or (self.started and self.game.turn != self.color), timeout=1)
+                self.finish_if_over()
+                if self.started and not self.finished and self.game.turn != self.color:
+                    play_turn(self.game, self.opponent, end_turn_last=False)
+                    self.finish_if_over()
+                    self.condition.notify_all()
+        self.opponent.handle_game_end(self.game.get_winner_color(), self.game.get_win_reason(), self.game.get_game_history())
+
+    def get(self, endpoint):
+        with self.condition:
+            self.finish_if_over()
+            game = self.game
+            if endpoint == 'color':
+                return {'color': self.color}
+            elif endpoint == 'starting_board':
+                return {'board': chess.Board()}
+            elif endpoint == 'opponent_name':
+                return {'opponent_name': self.opponent.__class__.__name__}
+            elif endpoint == 'sense_actions':
+                return {'sense_actions': game.sense_actions()}
+            elif endpoint == 'move_actions':
+                return {'move_actions': game.move_actions()}
+            elif endpoint == 'seconds_left':
+                return {'seconds_left': game.seconds_left_by_color[self.color] if game.turn != self.color else game.get_seconds_left()}
+            elif endpoint == 'is_my_turn':
+                return {'is_my_turn': self.is_my_turn()}
+            elif endpoint == 'opponent_move_results':
+                return {'opponent_move_results': game.opponent_move_results()}
+            elif endpoint == 'game_status':
+                return {'is_over': self.finished, 'is_my_turn': self.is_my_turn()}
+            elif endpoint == 'winner_color':
+                return {'winner_color': game.get_winner_color()}
+            elif endpoint == 'win_reason':
+                return {'win_reason': game.get_win_reason()}
+            elif endpoint == 'game_history':
+                return {'game_history': game.get_game_history()}
+            raise KeyError(endpoint)
+
+    def post(self, endpoint, obj):
+        if endpoint == 'ready':
+            self.start()
+            return {}
+        with self.condition:
+            self.finish_if_over()
+            game = self.game
+            if endpoint == 'error_resign':
+                if not self.finished:
+                    game.resign()
+                    self.finish_if_over()
+                return {}
+            # once the game is finished LocalGame ignores senses and moves
+            if not self.finished and not self.is_my_turn():
+                raise ValueError('not your turn')
+            if endpoint == 'sense':
+                return {'sense_result': game.sense(obj['square'])}
+            elif endpoint == 'move':
+                return {'move_result': game.move(obj['requested_move'])}
+            elif endpoint == 'end_turn':
+                if not self.finished:
+                    game.end_turn()
+                    self.finish_if_over()
+                    self.condition.notify_all()
+                return {}
+            raise KeyError(endpoint)
+
+
+class LocalServer:
+    """
+    Serves the HTTP endpoints used by :class:`RemoteGame` and reconchess.scripts.rc_connect for games played against
+    local opponents. Authentication is ignored.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, seconds_per_player=900, full_turn_limit=None):
+        self.seconds_per_player = seconds_per_player
+        self.full_turn_limit = full_turn_limit
+        self.games = {}  # maps game id to ServerGame
+        self.invitations = {}  # maps invitation id to [game id, accepted]
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), LocalServerHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.local_server = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def create_game(self, color, opponent: Player):
+        """
+        :param color: color of the remote player
+        :param opponent: local :class:`Player` playing the other color
+        :return: game id
+        """
+        with self.lock:
+            game_id = next(self.ids)
+            self.games[game_id] = ServerGame(game_id, color, opponent, self.seconds_per_player, self.full_turn_limit)
+        return game_id
+
+    def invite(self, color, opponent: Player):
+        """
+        Creates a game and an invitation to it, as if another user had invited the remote player.
+        :return: invitation id
+        """
+        game_id = self.create_game(color, opponent)
+        with self.lock:
+            invitation_id = next(self.ids)
+            self.invitations[invitation_id] = [game_id, False]
+        return invitation_id
+
+    def get(self, path):
+        if path == '/api/version':
+            return {'version': reconchess.__version__}
+        elif path == '/api/users/me/version':
+            return {'version': 1}
+        elif path == '/api/users/':
+            return {'usernames': []}
+        elif path == '/api/invitations/':
+            with self.lock:
+                return {'invitations': [i for i, (_, accepted) in self.invitations.items() if not accepted]}
+        match = re.fullmatch(r'/api/games/(\d+)/(\w+)', path)
+        if match:
+            return self.games[int(match.group(1))].get(match.group(2))
+        raise KeyError(path)
+
+    def post(self, path, obj):
+        if path in ['/api/users/me/max_games', '/api/users/me/ranked', '/api/users/me/version']:
+            return {}
+        match = re.fullmatch(r'/api/invitations/(\d+)(/finish)?', path)
+        if match:
+            with self.lock:
+                invitation = self.invitations[int(match.group(1))]
+                invitation[1] = True
+            return {} if match.group(2) else {'game_id': invitation[0]}
+        match = re.fullmatch(r'/api/games/(\d+)/(\w+)', path)
+        if match:
+            return self.games[int(match.group(1))].post(match.group(2), obj)
+        raise KeyError(path)
+
+
+class LocalServerHandler(BaseHTTPRequestHandler):
+    def respond(self, status, obj):
+        data = json.dumps(obj, cls=GameHistoryEncoder).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_request(self, fn, *args):
+        try:
+            self.respond(200, fn(self.path, *args))
+        except KeyError as e:
+            self.respond(404, {'error': 'not found: {}'.format(e)})
+        except ValueError as e:
+            self.respond(400, {'error': str(e)})
+
+    def do_GET(self):
+        self.handle_request(self.server.local_server.get)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length > 0 else b''
+        obj = json.loads(body, cls=ChessJSONDecoder) if body else {}
+        self.handle_request(self.server.local_server.post, obj)
+
+    def log_message(self, format, *args):
+        pass
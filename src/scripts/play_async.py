@@ -0,0 +1,238 @@
+import argparse
+import asyncio
+import concurrent.futures
+import signal
+import sys
+import traceback
+from datetime import datetime
+
+import requests
+from reconchess import load_player, Player, RemoteGame
+from reconchess.scripts.rc_connect import RBCServer, ask_for_username, ask_for_password, check_package_version, \
+    ranked_mode, unranked_mode
+
+from axolotl import AxolotlBot
+from engine_pool import EnginePool
+import profiling
+
+# modification of reconchess.scripts.rc_connect for playing many games in one process with shared engines
+
+STATUS_INTERVAL = 0.5  # seconds between polls of the server while waiting for our turn
+INVITATION_INTERVAL = 5  # seconds between polls of the server for new invitations
+
+
+async def play_remote_game_async(server_url, game_id, auth, player: Player, executor, status_interval=STATUS_INTERVAL):
+    """
+    Asyncio version of :func:`play_remote_game`. HTTP requests and player callbacks run in `executor`, and waiting
+    for our turn does not hold a thread, so many games can be played concurrently in one event loop.
+
+    :param server_url: URL of the server.
+    :param game_id: id of the game to play.
+    :param auth: (username, password) tuple.
+    :param player: The :class:`Player` playing the game.
+    :param executor: Executor running the blocking calls.
+    :param status_interval: Seconds between polls of the server while waiting for our turn.
+    :return: The results of the game, also passed to the player via :meth:`Player.handle_game_end`.
+    """
+    loop = asyncio.get_running_loop()
+
+    def call(fn, *args):
+        return loop.run_in_executor(executor, fn, *args)
+
+    game = RemoteGame(server_url, game_id, auth)
+
+    color = await call(game.get_player_color)
+    starting_board = await call(game.get_starting_board)
+    opponent_name = await call(game.get_opponent_name)
+    await call(player.handle_game_start, color, starting_board, opponent_name)
+    await call(game.start)
+
+    while not await is_over_async(game, call, status_interval):
+        await play_turn_async(game, player, call)
+
+    winner_color = await call(game.get_winner_color)
+    win_reason = await call(game.get_win_reason)
+    game_history = await call(game.get_game_history)
+
+    await call(player.handle_game_end, winner_color, win_reason, game_history)
+
+    return winner_color, win_reason, game_history
+
+
+async def is_over_async(game: RemoteGame, call, status_interval=STATUS_INTERVAL):
+    """
+    Asyncio version of :meth:`RemoteGame.is_over`. Waits until the game is over or it is our turn.
+
+    :return: Returns `True` if the game is over, `False` if it is our turn.
+    """
+    while True:
+        status = await call(game._get, 'game_status')
+        if status['is_over']:
+            return True
+        if status['is_my_turn']:
+            return False
+        await asyncio.sleep(status_interval)
+
+
+async def play_turn_async(game: RemoteGame, player: Player, call):
+    """
+    Asyncio version of :func:`play_turn` with `end_turn_last` set to False.
+    The clock is fetched right before each choice, so a shared :class:`EnginePool` can prioritize games low on time.
+    """
+    sense_actions = await call(game.sense_actions)
+    move_actions = await call(game.move_actions)
+
+    opt_capture_square = await call(game.opponent_move_results)
+    await call(player.handle_opponent_move_result, opt_capture_square is not None, opt_capture_square)
+
+    seconds_left = await call(game.get_seconds_left)
+    sense = await call(player.choose_sense, sense_actions, move_actions, seconds_left)
+    sense_result = await call(game.sense, sense)
+    await call(player.handle_sense_result, sense_result)
+
+    seconds_left = await call(game.get_seconds_left)
+    move = await call(player.choose_move, move_actions, seconds_left)
+    requested_move, taken_move, opt_enemy_capture_square = await call(game.move, move)
+    await call(game.end_turn)
+    await call(player.handle_move_result, requested_move, taken_move,
+               opt_enemy_capture_square is not None, opt_enemy_capture_square)
+
+
+async def play_remote_games(server_url, game_ids, auth, players, status_interval=STATUS_INTERVAL):
+    """
+    Plays several remote games concurrently, one player per game.
+
+    :return: List of the results of each game.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2 * len(game_ids)) as executor:
+        return await asyncio.gather(*[
+            play_remote_game_async(server_url, game_id, auth, player, executor, status_interval)
+            for game_id, player in zip(game_ids, players)
+        ])
+
+
+def make_player(bot_cls, engine_pool):
+    if engine_pool is not None and issubclass(bot_cls, AxolotlBot):
+        return bot_cls(engine_pool=engine_pool)
+    return bot_cls()
+
+
+async def accept_invitation_and_play(server, invitation_id, bot_cls, engine_pool, executor):
+    loop = asyncio.get_running_loop()
+    print('[{}] Accepting invitation {}.'.format(datetime.now(), invitation_id))
+    game_id = await loop.run_in_executor(executor, server.accept_invitation, invitation_id)
+    print('[{}] Invitation {} accepted. Playing game {}.'.format(datetime.now(), invitation_id, game_id))
+
+    try:
+        await play_remote_game_async(server.server_url, game_id, server.session.auth,
+                                     make_player(bot_cls, engine_pool), executor)
+        print('[{}] Finished game {}'.format(datetime.now(), game_id))
+    except Exception:
+        print('[{}] Fatal error in game {}:'.format(datetime.now(), game_id))
+        traceback.print_exc()
+        await loop.run_in_executor(executor, server.error_resign, game_id)
+    finally:
+        await loop.run_in_executor(executor, server.finish_invitation, invitation_id)
+
+
+async def listen_for_invitations(server, bot_cls, max_concurrent_games, engine_pool=None):
+    """
+    Asyncio version of reconchess.scripts.rc_connect.listen_for_invitations that plays games as tasks in this process
+    instead of starting a process per game.
+    """
+    loop = asyncio.get_running_loop()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=2 * max_concurrent_games + 1)
+    connected = False
+    task_by_invitation = {}
+    while True:
+        try:
+            invitations = await loop.run_in_executor(executor, server.get_invitations)
+
+            if not connected:
+                print('[{}] Connected successfully to server!'.format(datetime.now()))
+                connected = True
+                await loop.run_in_executor(executor, server.set_max_games, max_concurrent_games)
+
+            for invitation in [i for i, task in task_by_invitation.items() if task.done()]:
+                del task_by_invitation[invitation]
+
+            for invitation in invitations:
+                if invitation not in task_by_invitation:
+                    print('[{}] Received invitation {}.'.format(datetime.now(), invitation))
+
+                    if len(task_by_invitation) < max_concurrent_games:
+                        task_by_invitation[invitation] = asyncio.create_task(
+                            accept_invitation_and_play(server, invitation, bot_cls, engine_pool, executor))
+                    else:
+                        print('[{}] Not enough game slots to play invitation {}.'.format(datetime.now(), invitation))
+
+        except requests.RequestException as e:
+            connected = False
+            print('[{}] Failed to connect to server'.format(datetime.now()))
+            print(e)
+        except Exception:
+            print("Error in invitation processing: ")
+            traceback.print_exc()
+
+        await asyncio.sleep(INVITATION_INTERVAL)
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('bot_path', help='Path to bot source or bot module name.')
+    parser.add_argument('--username', default=None, help='Username for login. Enter with prompt if not specified.')
+    parser.add_argument('--password', default=None, help='Password for login. Enter with prompt if not specified.')
+    parser.add_argument('--server-url', default='https://rbc.jhuapl.edu', help='URL of the server.')
+    parser.add_argument('--ranked', action='store_true', default=False,
+                        help='Whether you want to play ranked matches.')
+    parser.add_argument('--keep-version', action='store_true', default=False,
+                        help='Force your ranked version to stay the same with no prompts.')
+    parser.add_argument('--max-concurrent-games', type=int, default=4,
+                        help='The maximum number of games to play at the same time.')
+    parser.add_argument('--engines', type=int, default=1,
+                        help='The number of engines shared by all games of an AxolotlBot.')
+    parser.add_argument('--profile', default=None, choices=['cprofile', 'sample'],
+                        help='Profile the callbacks of AxolotlBot.')
+    parser.add_argument('--profile-dir', default='profiles',
+                        help='Directory to write profiles to.')
+    parser.add_argument('--memory', action='store_true', default=False,
+                        help='Track memory of the callbacks of AxolotlBot with tracemalloc.')
+    args = parser.parse_args()
+
+    if args.profile is not None:
+        profiling.enable(args.profile, args.profile_dir)
+    if args.memory:
+        profiling.enable_memory()
+
+    bot_name, bot_cls = load_player(args.bot_path)
+
+    username = ask_for_username() if args.username is None else args.username
+    password = ask_for_password() if args.password is None else args.password
+    auth = username, password
+
+    server = RBCServer(args.server_url, auth)
+
+    check_package_version(server)
+
+    engine_pool = EnginePool(args.engines) if issubclass(bot_cls, AxolotlBot) else None
+
+    def handle_term(signum, frame):
+        print('[{}] Received terminate signal, exiting...'.format(datetime.now()))
+        unranked_mode(server)
+        if engine_pool is not None:
+            engine_pool.quit()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, handle_term)
+    signal.signal(signal.SIGTERM, handle_term)
+
+    if args.ranked:
+        ranked_mode(server, args.keep_version)
+    else:
+        unranked_mode(server)
+
+    asyncio.run(listen_for_invitations(server, bot_cls, args.max_concurrent_games, engine_pool))
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,7 @@ from axolotl import AxolotlBot
 # modification of reconchess.scripts.play for debugging
 
 
-def play_local_game(white_player: Player, black_player: Player, game: LocalGame = None, seconds_per_player: float = 900) -> Tuple[Optional[Color], Optional[WinReason], GameHistory]:
+def play_local_game(white_player: Player, black_player: Player, game: LocalGame = None, seconds_per_player: float = 900, check_rate: float = 1.0) -> Tuple[Optional[Color], Optional[WinReason], GameHistory]:
     """
     Plays a game between the two players passed in. Uses :class:`LocalGame` to run the game, and just calls
     :func:`play_turn` until the game is over: ::
@@ -21,6 +21,7 @@ def play_local_game(white_player: Player, black_player: Player, game: LocalGame
     :param black_player: The black :class:`Player`.
     :param game: The :class:`LocalGame` object to use.
     :param seconds_per_player: The time each player has to play. Only used if `game` is not passed in.
+    :param check_rate: Fraction of hypotheses checked by :func:`check_player` after every phase.
     :return: The results of the game, also passed to each player via :meth:`Player.handle_game_end`.
     """
     players = [black_player, white_player]
@@ -37,7 +38,7 @@ def play_local_game(white_player: Player, black_player: Player, game: LocalGame
     game.start()
 
     while not game.is_over():
-        play_turn(game, players[game.turn], end_turn_last=True)
+        play_turn(game, players[game.turn], end_turn_last=True, check_rate=check_rate)
 
     game.end()
     winner_color = game.get_winner_color()
@@ -68,7 +69,7 @@ def play_remote_game(server_url, game_id, auth, player: Player):
     return winner_color, win_reason, game_history
 
 
-def play_turn(game: Game, player: Player, end_turn_last=False):
+def play_turn(game: Game, player: Player, end_turn_last=False, check_rate: float = 1.0):
     """
     Coordinates playing a turn for `player` in `game`. Does the following sequentially:
 
@@ -81,18 +82,19 @@ def play_turn(game: Game, player: Player, end_turn_last=False):
     :param game: The :class:`Game` that `player` is playing in.
     :param player: The :class:`Player` whose turn it is.
     :param end_turn_last: Flag indicating whether to call :meth:`Game.end_turn` before or after :meth:`Player.handle_move_result`
+    :param check_rate: Fraction of hypotheses checked by :func:`check_player` after every phase.
     """
     sense_actions = game.sense_actions()
     move_actions = game.move_actions()
 
-    notify_opponent_move_results(game, player)
+    notify_opponent_move_results(game, player, check_rate=check_rate)
 
-    play_sense(game, player, sense_actions, move_actions)
+    play_sense(game, player, sense_actions, move_actions, check_rate=check_rate)
 
-    play_move(game, player, move_actions, end_turn_last=end_turn_last)
+    play_move(game, player, move_actions, end_turn_last=end_turn_last, check_rate=check_rate)
 
 
-def notify_opponent_move_results(game: Game, player: Player):
+def notify_opponent_move_results(game: Game, player: Player, check_rate: float = 1.0):
     """
     Passes the opponents move results to the player. Does the following sequentially:
 
@@ -101,15 +103,14 @@ def notify_opponent_move_results(game: Game, player: Player):
 
     :param game: The :class:`Game` that `player` is playing in.
     :param player: The :class:`Player` whose turn it is.
+    :param check_rate: Fraction of hypotheses checked by :func:`check_player`.
     """
     opt_capture_square = game.opponent_move_results()
     player.handle_opponent_move_result(opt_capture_square is not None, opt_capture_square)
-    if isinstance(player, AxolotlBot) and isinstance(game, LocalGame):
-        player.check_hypotheses(game.board)
-        player.check_friendly_pieces()
+    check_player(game, player, check_rate)
 
 
-def play_sense(game: Game, player: Player, sense_actions: List[Square], move_actions: List[chess.Move]):
+def play_sense(game: Game, player: Player, sense_actions: List[Square], move_actions: List[chess.Move], check_rate: float = 1.0):
     """
     Runs the sense phase for `player` in `game`. Does the following sequentially:
 
@@ -121,16 +122,15 @@ def play_sense(game: Game, player: Player, sense_actions: List[Square], move_act
     :param player: The :class:`Player` whose turn it is.
     :param sense_actions: The possible sense actions for `player`.
     :param move_actions: The possible move actions for `player`.
+    :param check_rate: Fraction of hypotheses checked by :func:`check_player`.
     """
     sense = player.choose_sense(sense_actions, move_actions, game.get_seconds_left())
     sense_result = game.sense(sense)
     player.handle_sense_result(sense_result)
-    if isinstance(player, AxolotlBot) and isinstance(game, LocalGame):
-        player.check_hypotheses(game.board)
-        player.check_friendly_pieces()
+    check_player(game, player, check_rate)
 
 
-def play_move(game: Game, player: Player, move_actions: List[chess.Move], end_turn_last=False):
+def play_move(game: Game, player: Player, move_actions: List[chess.Move], end_turn_last=False, check_rate: float = 1.0):
     """
     Runs the move phase for `player` in `game`. Does the following sequentially:
 
@@ -146,6 +146,7 @@ def play_move(game: Game, player: Player, move_actions: List[chess.Move], end_tu
     :param player: The :class:`Player` whose turn it is.
     :param move_actions: The possible move actions for `player`.
     :param end_turn_last: Flag indicating whether to call :meth:`Game.end_turn` before or after :meth:`Player.handle_move_result`
+    :param check_rate: Fraction of hypotheses checked by :func:`check_player`.
     """
     move = player.choose_move(move_actions, game.get_seconds_left())
     requested_move, taken_move, opt_enemy_capture_square = game.move(move)
@@ -156,9 +157,26 @@ def play_move(game: Game, player: Player, move_actions: List[chess.Move], end_tu
     player.handle_move_result(requested_move, taken_move,
                               opt_enemy_capture_square is not None, opt_enemy_capture_square)
 
-    if isinstance(player, AxolotlBot) and isinstance(game, LocalGame):
-        player.check_hypotheses(game.board)
-        player.check_friendly_pieces()
+    check_player(game, player, check_rate)
 
     if end_turn_last:
         game.end_turn()
+
+
+def check_player(game: Game, player: Player, check_rate: float = 1.0):
+    """
+    Checks that the beliefs of `player` are consistent with the true board. Only runs if `player` is an
+    :class:`AxolotlBot` playing a :class:`LocalGame`. Does the following sequentially:
+
+    #. Check the true board is one of the hypotheses using :meth:`AxolotlBot.check_hypotheses`.
+    #. Check the friendly pieces of a random sample of hypotheses using :meth:`AxolotlBot.validate_friendly_pieces`.
+
+    :param game: The :class:`Game` that `player` is playing in.
+    :param player: The :class:`Player` to check.
+    :param check_rate: Fraction of hypotheses to check friendly pieces of. Checks are skipped entirely if 0.
+    """
+    if check_rate <= 0:
+        return
+    if isinstance(player, AxolotlBot) and isinstance(game, LocalGame):
+        player.check_hypotheses(game.board)
+        player.validate_friendly_pieces(check_rate)
@@ -0,0 +1,76 @@
+import random
+
+import chess
+
+# seeded generator of large beliefs for benchmarks and tests
+
+
+def friendly_board_of(board: chess.Board, color: chess.Color) -> chess.Board:
+    """
+    Returns a copy of board with only the pieces of color, the same way AxolotlBot.handle_game_start builds its friendly board.
+    """
+    friendly_board = board.copy(stack=False)
+    for square in range(64):
+        if board.color_at(square) != color:
+            friendly_board.remove_piece_at(square)
+    if color:
+        friendly_board.castling_rights &= chess.BB_A1 | chess.BB_H1
+    else:
+        friendly_board.castling_rights &= chess.BB_A8 | chess.BB_H8
+    return friendly_board
+
+
+def generate_belief(board: chess.Board, color: chess.Color, size: int, seed=0):
+    """
+    Generates a plausible belief of the player of color with at least size hypotheses (exactly size unless the
+    position runs out of variations). Starting from board, the opponent makes random non-capturing moves or passes,
+    and we pass after each of their moves, one level of plies at a time until a level has enough distinct positions.
+    So every hypothesis has the same friendly pieces, the same move counter and it is our turn, as if we had not sensed
+    for several turns. Probabilities are random and normalized.
+    :param board: starting position
+    :param color: our color
+    :param size: number of hypotheses
+    :param seed: random seed
+    :return: (friendly board, hypotheses), where hypotheses is a dictionary mapping fen strings to probability
+    """
+    rng = random.Random(seed)
+    start = board.copy(stack=False)
+    if start.turn == color:
+        start.push(chess.Move.null())
+    friendly_board = friendly_board_of(start, color)
+
+    level = [start.fen(shredder=True)]
+    while True:
+        rng.shuffle(level)
+        children = {}
+        for fen in level:
+            parent = chess.Board(fen)
+            if parent.turn == color:
+                # pass our turn before the opponent moves again
+                parent.push(chess.Move.null())
+            moves = [move for move in parent.pseudo_legal_moves if not parent.is_capture(move)]
+            moves.append(chess.Move.null())
+            for move in moves:
+                parent.push(move)
+                children[parent.fen(shredder=True)] = None
+                parent.pop()
+            if len(children) >= size:
+                break
+        friendly_board.push(chess.Move.null())
+
+        if len(children) >= size or len(children) <= len(level):
+            break
+        level = list(children)
+        friendly_board.push(chess.Move.null())
+
+    if len(children) < size:
+        print("Generated only " + str(len(children)) + " hypotheses")
+    fens = list(children)
+    rng.shuffle(fens)
+    fens = fens[:size]
+
+    weights = [rng.expovariate(1) for _ in fens]
+    tot = sum(weights)
+    hypotheses = {fen: w / tot for fen, w in zip(fens, weights)}
+
+    return friendly_board, hypotheses
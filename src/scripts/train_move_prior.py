@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import tarfile
+import zipfile
+
+from reconchess.history import GameHistoryDecoder
+from reconchess.utilities import move_actions
+
+from move_prior import MovePrior
+
+# offline trainer of the opponent move prior, see move_prior.py
+# scans saved GameHistory replays (json files) in directories, zip archives and tar archives
+
+
+def iter_histories(path):
+    """
+    Yields GameHistory objects of all json files at path.
+    :param path: json file, directory, zip archive or tar archive
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            for name in sorted(files):
+                yield from iter_histories(os.path.join(root, name))
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                if name.endswith('.json'):
+                    yield json.loads(archive.read(name), cls=GameHistoryDecoder)
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path) as archive:
+            for member in archive:
+                if member.isfile() and member.name.endswith('.json'):
+                    yield json.loads(archive.extractfile(member).read(), cls=GameHistoryDecoder)
+    elif path.endswith('.json'):
+        with open(path, newline='') as f:
+            yield json.load(f, cls=GameHistoryDecoder)
+
+
+def train(paths, exclude=()):
+    """
+    :param paths: paths of replays, see iter_histories
+    :param exclude: names of players whose moves are not counted, e.g. our own bot
+    :return: MovePrior
+    """
+    prior = MovePrior()
+    games = 0
+    decisions = 0
+    for path in paths:
+        for history in iter_histories(path):
+            games += 1
+            names = [history.get_black_player_name(), history.get_white_player_name()]
+            for turn in history.turns():
+                if names[turn.color] in exclude or not history.has_move(turn):
+                    continue
+                board = history.truth_board_before_move(turn)
+                prior.observe(board, move_actions(board), history.requested_move(turn))
+                decisions += 1
+    print('Counted {} moves in {} games'.format(decisions, games))
+    return prior
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='json replays, directories or zip/tar archives of replays.')
+    parser.add_argument('--output', default='move_prior.json', help='path of move prior table to write.')
+    parser.add_argument('--exclude', default=[], nargs='*', help='names of players to leave out, e.g. our own bot.')
+    args = parser.parse_args()
+
+    prior = train(args.paths, set(args.exclude))
+    prior.save(args.output)
+    print('Wrote move prior to {}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import math
+import multiprocessing
+import struct
+from array import array
+from multiprocessing import shared_memory
+
+# hypotheses in shared memory for worker processes, so large beliefs are not pickled to workers every turn
+#
+# layout of the shared memory block, for a capacity of n hypotheses:
+#   n fen strings, each padded with spaces to FEN_WIDTH bytes (ascii)
+#   n probabilities (float64 each)
+# workers attach to the block once and read and write slices of it in place
+
+FEN_WIDTH = 96  # longest possible fen string is 90 characters
+REMOVED = -1.0  # probability written by workers for removed hypotheses
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class SharedBelief:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.memory = shared_memory.SharedMemory(create=True, size=max(capacity, 1) * (FEN_WIDTH + 8))
+        self.count = 0
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def write(self, hypotheses):
+        """
+        :param hypotheses: dictionary mapping fen strings to probability, at most capacity many
+        """
+        n = len(hypotheses)
+        if n > self.capacity:
+            raise Exception("belief does not fit in shared memory")
+        self.memory.buf[:n * FEN_WIDTH] = "".join(h.ljust(FEN_WIDTH) for h in hypotheses).encode("ascii")
+        offset = self.capacity * FEN_WIDTH
+        self.memory.buf[offset:offset + 8 * n] = array("d", hypotheses.values()).tobytes()
+        self.count = n
+
+    def probabilities(self):
+        """
+        :return: array of probabilities of all hypotheses, REMOVED for hypotheses removed by workers
+        """
+        offset = self.capacity * FEN_WIDTH
+        probabilities = array("d")
+        probabilities.frombytes(self.memory.buf[offset:offset + 8 * self.count])
+        return probabilities
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+# worker side
+
+attached = {}  # maps name to shared memory block attached in this worker process
+
+
+def attach(name):
+    if name not in attached:
+        for memory in attached.values():
+            memory.close()
+        attached.clear()
+        attached[name] = shared_memory.SharedMemory(name=name)
+    return attached[name].buf
+
+
+def read_slice(buf, capacity, start, stop):
+    """
+    :return: lists of fen strings and probabilities of hypotheses start to stop
+    """
+    fens = bytes(buf[start * FEN_WIDTH:stop * FEN_WIDTH]).decode("ascii")
+    fens = [fens[i:i + FEN_WIDTH].rstrip() for i in range(0, len(fens), FEN_WIDTH)]
+    offset = capacity * FEN_WIDTH
+    probabilities = array("d")
+    probabilities.frombytes(buf[offset + 8 * start:offset + 8 * stop])
+    return fens, probabilities
+
+
+def tally_task(name, capacity, start, stop):
+    from axolotl import AxolotlBot
+    fens, probabilities = read_slice(attach(name), capacity, start, stop)
+    return AxolotlBot.tally_senses(zip(fens, probabilities))
+
+
+def filter_task(name, capacity, start, stop, square, result):
+    from axolotl import AxolotlBot
+    buf = attach(name)
+    fens, probabilities = read_slice(buf, capacity, start, stop)
+    offset = capacity * FEN_WIDTH + 8 * start
+    for i, h in enumerate(fens):
+        if AxolotlBot.sense_expanded_fen(AxolotlBot.expand_fen(h), square) != result:
+            struct.pack_into("<d", buf, offset + 8 * i, REMOVED)
+
+
+class BeliefWorkers:
+    """
+    Persistent worker processes for sense tallying and filtering on a SharedBelief.
+    The belief is only copied to shared memory when the hypotheses dictionary changes.
+    """
+
+    def __init__(self, processes):
+        self.processes = processes
+        self.pool = multiprocessing.get_context(START_METHOD).Pool(processes)
+        self.belief = None
+        self.source = None  # hypotheses dictionary currently in shared memory
+
+    def share(self, hypotheses):
+        if hypotheses is self.source:
+            return
+        if self.belief is None or len(hypotheses) > self.belief.capacity:
+            if self.belief is not None:
+                self.belief.close()
+            self.belief = SharedBelief(2 * len(hypotheses))
+        self.belief.write(hypotheses)
+        self.source = hypotheses
+
+    def slices(self):
+        # a few slices per process to balance the load
+        size = max(math.ceil(self.belief.count / (4 * self.processes)), 1)
+        return [(self.belief.name, self.belief.capacity, start, min(start + size, self.belief.count))
+                for start in range(0, self.belief.count, size)]
+
+    def tally_senses(self, hypotheses):
+        """
+        Same as AxolotlBot.tally_senses(hypotheses.items()), split over the workers.
+        """
+        self.share(hypotheses)
+        partials = self.pool.starmap(tally_task, self.slices())
+        if not partials:
+            from axolotl import AxolotlBot
+            return AxolotlBot.tally_senses([])
+        distributions = partials[0]
+        for partial in partials[1:]:
+            for square, dist in partial.items():
+                total = distributions[square]
+                for result, (p, c) in dist.items():
+                    if result in total:
+                        (q, d) = total[result]
+                        total[result] = (p + q, c + d)
+                    else:
+                        total[result] = (p, c)
+        return distributions
+
+    def filter(self, hypotheses, square, result):
+        """
+        :return: dictionary of hypotheses with the given sense result on square, not normalized
+        """
+        self.share(hypotheses)
+        self.pool.starmap(filter_task, [s + (square, result) for s in self.slices()])
+        # workers modified the probabilities in shared memory
+        self.source = None
+        return {h: p for h, p in zip(hypotheses, self.belief.probabilities()) if p != REMOVED}
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        if self.belief is not None:
+            self.belief.close()
+            self.belief = None
+        self.source = None
@@ -0,0 +1,133 @@
+import chess
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# static evaluation of many boards at once with numpy, see AxolotlBot.evaluate_static
+# score is material plus piece-square tables, minus a penalty for every empty square next to the king, since in
+# reconnaissance blind chess an open king is more likely to be captured by a move we did not see
+
+PIECE_VALUES = {chess.PAWN: 100, chess.KNIGHT: 320, chess.BISHOP: 330, chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0}
+KING_EXPOSURE = 15  # centipawns per empty square next to the king
+
+# piece-square tables for white, rank 8 first
+PIECE_SQUARE_TABLES = {
+    chess.PAWN: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ],
+    chess.KNIGHT: [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ],
+    chess.BISHOP: [
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ],
+    chess.ROOK: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0,
+    ],
+    chess.QUEEN: [
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20,
+    ],
+    chess.KING: [
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20,
+    ],
+}
+
+
+def weights():
+    """
+    :return: array of shape (12, 64) with the score of each piece (white pawn to king, then black) on each square
+    """
+    w = np.zeros((12, 64))
+    for piece_type in chess.PIECE_TYPES:
+        for square in chess.SQUARES:
+            # tables are rank 8 first, square ^ 56 flips the rank
+            w[piece_type - 1, square] = PIECE_VALUES[piece_type] + PIECE_SQUARE_TABLES[piece_type][square ^ 56]
+            w[piece_type + 5, square] = -(PIECE_VALUES[piece_type] + PIECE_SQUARE_TABLES[piece_type][square])
+    return w
+
+
+def king_zones():
+    """
+    :return: array of shape (64, 64), row i marks the squares next to a king on square i
+    """
+    zones = np.zeros((64, 64))
+    for square in chess.SQUARES:
+        for neighbor in chess.SquareSet(chess.BB_KING_ATTACKS[square]):
+            zones[square, neighbor] = 1
+    return zones
+
+
+WEIGHTS = None if np is None else weights()
+KING_ZONES = None if np is None else king_zones()
+
+
+def pack(boards):
+    """
+    :param boards: list of boards
+    :return: array of shape (len(boards), 12) of piece bitboards, in the order of WEIGHTS
+    """
+    return np.array([[board.pieces_mask(piece_type, color) for color in (chess.WHITE, chess.BLACK) for piece_type in chess.PIECE_TYPES]
+                     for board in boards], dtype=np.uint64).reshape(len(boards), 12)
+
+
+def evaluate_boards(boards, color):
+    """
+    Scores boards with material, piece-square tables and king exposure.
+    :param boards: list of boards
+    :param color: color to score from
+    :return: array of scores in centipawns
+    """
+    packed = pack(boards)
+    bits = np.unpackbits(packed.astype("<u8").view(np.uint8), bitorder="little").reshape(len(boards), 12, 64)
+    score = np.einsum("npk,pk->n", bits, WEIGHTS)
+
+    empty = 1 - bits.max(axis=1)
+    white_king = bits[:, chess.KING - 1].argmax(axis=1)
+    black_king = bits[:, chess.KING + 5].argmax(axis=1)
+    score -= KING_EXPOSURE * (KING_ZONES[white_king] * empty).sum(axis=1)
+    score += KING_EXPOSURE * (KING_ZONES[black_king] * empty).sum(axis=1)
+    return score if color == chess.WHITE else -score
@@ -1,8 +1,10 @@
+import random
 import unittest
 
 import chess
 from reconchess import GameHistory
 from src import AxolotlBot
+from src.scripts.synthetic_belief import generate_belief
 
 
 class GameStartTestCase(unittest.TestCase):
@@ -12,6 +14,22 @@ class GameStartTestCase(unittest.TestCase):
         self.assertEqual(1, len(bot.hypotheses))
         bot.handle_game_end(None, None, GameHistory())
 
+    def test_reset(self):
+        bot = AxolotlBot()
+        bot.handle_game_start(chess.BLACK, chess.Board(), "")
+        bot.handle_opponent_move_result(False, None)
+        bot.hypotheses_cap = 10
+        bot.reset()
+        self.assertIsNone(bot.hypotheses)
+        self.assertIsNone(bot.hypotheses_cap)
+
+        # the engine is started again, since no engine pool is used
+        bot.handle_game_start(chess.WHITE, chess.Board(), "")
+        self.assertEqual({chess.Board().fen(shredder=True): 1.0}, bot.hypotheses)
+        graph = bot.generate_submove_graph()
+        self.assertEqual(chess.Move.from_uci("e1f1"), graph[chess.Move.from_uci("e1g1")])
+        bot.handle_game_end(None, None, GameHistory())
+
 
 class OpponentMoveResultTestCase(unittest.TestCase):
     def test_basic(self):
@@ -93,6 +111,32 @@ class ChooseSenseTestCase(unittest.TestCase):
         self.assertEqual(chess.B2, bot.choose_sense([], [], 10))
         bot.handle_game_end(None, None, GameHistory())
 
+    def test_sample(self):
+        bot = AxolotlBot()
+        bot.friendly_board, bot.hypotheses = generate_belief(chess.Board(), chess.WHITE, 2000, seed=1)
+        random.seed(0)
+        sense = bot.sample_sense()
+
+        # expected probability remaining after sensing each square
+        remaining = {square: sum(p * p for p, c in dist.values()) for square, dist in bot.tally_senses(bot.hypotheses.items()).items()}
+        self.assertLess(remaining[sense] - min(remaining.values()), 0.02)
+
+
+class MemoryLimitTestCase(unittest.TestCase):
+    def test_prune(self):
+        bot = AxolotlBot()
+        bot.friendly_board, bot.hypotheses = generate_belief(chess.Board(), chess.WHITE, 1000, seed=1)
+        likely = max(bot.hypotheses, key=bot.hypotheses.get)
+        bot.memory_limit = 1
+        bot.enforce_memory_limit()
+        self.assertEqual(1, bot.hypotheses_cap)
+        self.assertEqual({likely: 1.0}, bot.hypotheses)
+
+        bot.memory_limit = None
+        bot.hypotheses = {chess.STARTING_FEN: 0.5, "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/1NBQKBNR w Kkq - 0 1": 0.5}
+        bot.enforce_memory_limit()
+        self.assertEqual(2, len(bot.hypotheses))
+
 
 class SenseResultTestCase(unittest.TestCase):
     def test_basic(self):
@@ -203,6 +247,23 @@ class MoveResultTestCase(unittest.TestCase):
         bot.handle_game_end(None, None, GameHistory())
 
 
+class FriendlyPiecesTestCase(unittest.TestCase):
+    def test_basic(self):
+        bot = AxolotlBot()
+        bot.handle_game_start(chess.WHITE, chess.Board(), "")
+        bot.handle_opponent_move_result(False, None)
+        bot.validate_friendly_pieces()
+        bot.validate_friendly_pieces(0.5)
+        bot.handle_game_end(None, None, GameHistory())
+
+    def test_false(self):
+        bot = AxolotlBot()
+        bot.handle_game_start(chess.WHITE, chess.Board(), "")
+        bot.hypotheses = {chess.STARTING_FEN: 0.5, "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/1NBQKBNR w Kkq - 0 1": 0.5}
+        self.assertRaises(Exception, bot.validate_friendly_pieces)
+        bot.handle_game_end(None, None, GameHistory())
+
+
 class BasicTestCases(unittest.TestCase):
     def test_one_turn(self):
         board = chess.Board()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+import chess
+from reconchess import GameHistory
+from src import AxolotlBot
+from src.checkpoint import Checkpointer, Snapshot, read_snapshot, write_snapshot
+
+
+class SnapshotTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        hypotheses = {chess.STARTING_FEN: 0.25, "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/1NBQKBNR w Kkq - 0 1": 0.75}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.ckpt")
+            write_snapshot(path, Snapshot(chess.BLACK, "8/8/8/8/8/8/8/4K3 w - - 0 1", hypotheses, chess.B2, chess.Move.from_uci("e2e4"), "choose_move"))
+            snapshot = read_snapshot(path)
+        self.assertEqual(chess.BLACK, snapshot.color)
+        self.assertEqual("8/8/8/8/8/8/8/4K3 w - - 0 1", snapshot.friendly_fen)
+        self.assertEqual(hypotheses, snapshot.hypotheses)
+        self.assertEqual(chess.B2, snapshot.sense)
+        self.assertEqual(chess.Move.from_uci("e2e4"), snapshot.move)
+        self.assertEqual("choose_move", snapshot.phase)
+
+    def test_empty(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.ckpt")
+            write_snapshot(path, Snapshot(None, chess.STARTING_FEN, {}, None, None, "handle_sense_result"))
+            snapshot = read_snapshot(path)
+        self.assertIsNone(snapshot.color)
+        self.assertEqual({}, snapshot.hypotheses)
+        self.assertIsNone(snapshot.sense)
+        self.assertIsNone(snapshot.move)
+
+
+class CheckpointTestCase(unittest.TestCase):
+    def test_restore(self):
+        with tempfile.TemporaryDirectory() as directory:
+            bot = AxolotlBot()
+            bot.handle_game_start(chess.BLACK, chess.Board(), "")
+            bot.checkpointer = Checkpointer(os.path.join(directory, "test.ckpt"))
+            bot.handle_opponent_move_result(False, None)
+            bot.checkpointer.close()
+
+            restored = AxolotlBot()
+            self.assertEqual("handle_opponent_move_result", restored.restore_checkpoint(bot.checkpointer.path))
+            self.assertEqual(bot.hypotheses, restored.hypotheses)
+            self.assertEqual(bot.friendly_board.fen(), restored.friendly_board.fen())
+            self.assertEqual(chess.BLACK, restored.color)
+            bot.handle_game_end(None, None, GameHistory())
+            restored.handle_game_end(None, None, GameHistory())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+
+import chess
+from src import AxolotlBot
+from src.evaluation import EvaluationPlanner, classify_hypotheses, cluster_hypotheses, relevant_squares
+
+
+class KQvKTablebase:
+    # stands in for chess.syzygy.Tablebase, the side with the queen wins
+    def __init__(self):
+        self.probes = 0
+
+    def get_wdl(self, board, default=None):
+        self.probes += 1
+        if chess.popcount(board.occupied) != 3 or not board.pieces(chess.QUEEN, board.turn) | board.pieces(chess.QUEEN, not board.turn):
+            return default
+        return 2 if board.pieces(chess.QUEEN, board.turn) else -2
+
+
+class EvaluationPlannerTestCase(unittest.TestCase):
+    def test_deduplication(self):
+        # our knight captures a different opponent piece on e5 in each hypothesis
+        planner = EvaluationPlanner()
+        keys = []
+        for fen in ["4k3/8/8/4p3/8/5N2/8/4K3 w - - 0 1", "4k3/8/8/4n3/8/5N2/8/4K3 w - - 0 1", "4k3/8/8/4b3/8/5N2/8/4K3 w - - 3 7"]:
+            board = chess.Board(fen)
+            board.push(chess.Move.from_uci("f3e5"))
+            keys.append(planner.add(board))
+        board = chess.Board("4k3/8/8/4p3/8/5N2/8/4K3 w - - 0 1")
+        board.push(chess.Move.null())
+        keys.append(planner.add(board))
+
+        self.assertEqual(2, len(planner))
+        self.assertEqual(2, planner.avoided())
+        self.assertEqual(keys[0], keys[1])
+        self.assertEqual(keys[0], keys[2])
+
+        boards = []
+        scores = planner.run(lambda b: boards.append(b) or len(boards))
+        self.assertEqual(2, len(boards))
+        self.assertEqual({keys[0], keys[3]}, set(scores))
+
+    def test_resolve(self):
+        planner = EvaluationPlanner()
+        first = planner.add(chess.Board("4k3/8/8/8/8/8/8/3QK3 b - - 0 1"))
+        second = planner.add(chess.Board("4k3/8/8/8/8/8/8/3RK3 b - - 0 1"))
+        self.assertEqual(1, planner.resolve(lambda b: 1.0 if b.pieces(chess.QUEEN, chess.WHITE) else None))
+        self.assertEqual(1, len(planner))
+        self.assertEqual(first, planner.add(chess.Board("4k3/8/8/8/8/8/8/3QK3 b - - 0 1")))
+        self.assertEqual(1, planner.avoided())
+        self.assertEqual({first: 1.0, second: 0.5}, planner.run(lambda b: 0.5))
+
+    def test_static(self):
+        planner = EvaluationPlanner()
+        first = planner.add(chess.Board("4k3/8/8/8/8/8/8/3QK3 b - - 0 1"), static=True)
+        second = planner.add(chess.Board("4k3/8/8/8/8/8/8/3RK3 b - - 0 1"), static=True)
+        planner.add(chess.Board("4k3/8/8/8/8/8/8/3RK3 b - - 0 1"))
+        planner.add(chess.Board("4k3/8/8/8/8/8/8/3RK3 b - - 0 1"), static=True)
+        self.assertEqual(1, len(planner))
+        self.assertEqual(2, planner.avoided())
+        self.assertEqual({first: 0.25, second: 0.5}, planner.run(lambda b: 0.5, lambda boards: [0.25] * len(boards)))
+
+
+class ClassifyHypothesesTestCase(unittest.TestCase):
+    def test_classify(self):
+        fools_mate = "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3"
+        capturable = "rnbqkbnr/ppppp1pp/8/5p1Q/4P3/8/PPPP1PPP/RNB1KBNR w KQkq - 0 3"
+        # in check, but not mated
+        check = "4k3/8/8/8/1b6/8/8/4K3 w - - 0 1"
+        no_king = "8/8/8/8/8/8/8/4K3 w - - 0 1"
+        mated, kings, search = classify_hypotheses({fools_mate: 0.5, capturable: 0.25, check: 0.125, chess.STARTING_FEN: 0.0625, no_king: 0.0625}, chess.WHITE)
+        self.assertEqual([0.5], mated)
+        self.assertEqual([(chess.E8, 0.25)], kings)
+        self.assertEqual([check, chess.STARTING_FEN], [h for h, board, p in search])
+
+
+class ClusterHypothesesTestCase(unittest.TestCase):
+    def test_cluster(self):
+        friendly_board = chess.Board("8/8/8/8/8/8/4P3/4K3 w - - 0 1")
+        move_actions = [chess.Move.from_uci("e2e3"), chess.Move.from_uci("e2e4")]
+        bot = AxolotlBot()
+        bot.color = chess.WHITE
+        bot.friendly_board = friendly_board
+        relevant = relevant_squares(friendly_board, chess.WHITE, move_actions, bot.generate_submove_graph())
+        self.assertEqual(chess.SquareSet([chess.D1, chess.E1, chess.F1, chess.D2, chess.E2, chess.F2, chess.E3, chess.E4]), chess.SquareSet(relevant))
+
+        # a knight far away, in two places, and a bishop attacking d2
+        fens = ["4k1n1/8/8/8/8/8/4P3/4K3 w - - 0 1", "4k2n/8/8/8/8/8/4P3/4K3 w - - 0 1", "4k3/8/8/8/1b6/8/4P3/4K3 w - - 0 1"]
+        search = [(h, chess.Board(h), p) for h, p in zip(fens, [0.5, 0.25, 0.25])]
+
+        clustered, count = cluster_hypotheses(search, chess.WHITE, relevant, 0.25)
+        self.assertEqual(1, count)
+        self.assertEqual([(fens[0], 0.75), (fens[2], 0.25)], [(h, p) for h, board, p in clustered])
+
+        # over budget
+        clustered, count = cluster_hypotheses(search, chess.WHITE, relevant, 0.2)
+        self.assertEqual(0, count)
+        self.assertEqual(search, clustered)
+
+
+class TablebaseTestCase(unittest.TestCase):
+    def test_probe(self):
+        bot = AxolotlBot()
+        bot.color = chess.WHITE
+        bot.tablebase = KQvKTablebase()
+        bot.tablebase_pieces = 3
+
+        self.assertEqual(1.0, bot.probe_tablebase(chess.Board("4k3/8/8/8/8/8/8/3QK3 b - - 0 1")))
+        self.assertEqual(1.0, bot.probe_tablebase(chess.Board("4k3/8/8/8/8/8/8/3QK3 w - - 0 1")))
+        self.assertEqual(0.0, bot.probe_tablebase(chess.Board("3qk3/8/8/8/8/8/8/4K3 b - - 0 1")))
+        self.assertIsNone(bot.probe_tablebase(chess.Board("4k3/8/8/8/8/8/8/3RK3 b - - 0 1")))
+        self.assertIsNone(bot.probe_tablebase(chess.Board("4k3/8/8/8/8/8/8/2RQK3 b - - 0 1")))
+
+        # cached
+        probes = bot.tablebase.probes
+        self.assertEqual(1.0, bot.probe_tablebase(chess.Board("4k3/8/8/8/8/8/8/3QK3 b - - 5 9")))
+        self.assertEqual(probes, bot.tablebase.probes)
+
+
+if __name__ == '__main__':
+    unittest.main()
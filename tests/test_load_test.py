@@ -0,0 +1,28 @@
+import unittest
+
+from src.scripts.load_test import percentile, play, summarize
+
+
+class LoadTestTestCase(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(50, percentile(values, 50))
+        self.assertEqual(99, percentile(values, 99))
+        self.assertEqual(1, percentile([1], 95))
+
+    def test_play(self):
+        results = [play('reconchess.bots.random_bot', 'reconchess.bots.random_bot', seed, 60, full_turn_limit=5) for seed in range(2)]
+        for r in results:
+            self.assertIsNone(r['error'])
+            self.assertEqual(len(r['latencies']['white']['choose_move']), len([x for x in r['seconds_left']['white'] if x[0] == 'choose_move']))
+        # seeded games are the same
+        self.assertEqual(results[0]['moves'], play('reconchess.bots.random_bot', 'reconchess.bots.random_bot', 0, 60, full_turn_limit=5)['moves'])
+
+        summary = summarize(results, 1.0, 1)
+        self.assertEqual(7200, summary['games_per_hour'])
+        self.assertEqual(0, summary['errors'])
+        self.assertIn('choose_sense', summary['bots']['RandomBot']['latencies'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+import chess
+from reconchess.utilities import move_actions
+from src import AxolotlBot
+from src.move_prior import MovePrior
+
+
+class MovePriorTestCase(unittest.TestCase):
+    def test_weight(self):
+        board = chess.Board()
+        prior = MovePrior()
+        for _ in range(10):
+            prior.observe(board, move_actions(board), chess.Move.from_uci("e2e4"))
+        self.assertGreater(prior.weight(board, chess.Move.from_uci("e2e4")), prior.weight(board, chess.Move.from_uci("a2a3")))
+        self.assertGreater(prior.weight(board, chess.Move.from_uci("e2e4")), prior.weight(board, chess.Move.null()))
+
+        # moves of black are seen from black's side of the board
+        board.push(chess.Move.null())
+        self.assertEqual(prior.weight(chess.Board(), chess.Move.from_uci("e2e4")), prior.weight(board, chess.Move.from_uci("e7e5")))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "prior.json")
+            prior.save(path)
+            loaded = MovePrior.from_file(path)
+        self.assertEqual(prior.chosen, loaded.chosen)
+        self.assertEqual(prior.available, loaded.available)
+
+    def test_expansion(self):
+        board = chess.Board()
+        prior = MovePrior()
+        for _ in range(10):
+            prior.observe(board, move_actions(board), chess.Move.from_uci("e2e4"))
+        board.push(chess.Move.null())
+
+        bot = AxolotlBot()
+        bot.color = chess.WHITE
+        bot.hypotheses = {board.fen(shredder=True): 1.0}
+        uniform = bot.expand_hypotheses(False, None)
+        self.assertAlmostEqual(1.0, sum(uniform.values()))
+
+        bot.move_prior = prior
+        weighted = bot.expand_hypotheses(False, None)
+        self.assertAlmostEqual(1.0, sum(weighted.values()))
+        board.push(chess.Move.from_uci("e7e5"))
+        self.assertGreater(weighted[board.fen(shredder=True)], uniform[board.fen(shredder=True)])
+
+    def test_prune(self):
+        hypotheses = {"a": 0.5, "b": 0.3, "c": 0.15, "d": 0.04, "e": 0.01}
+        self.assertEqual({"a": 0.5, "b": 0.3, "c": 0.15}, AxolotlBot.prune_hypotheses(hypotheses, 0.06))
+        self.assertEqual({"a": 0.5, "b": 0.3, "c": 0.15, "d": 0.04}, AxolotlBot.prune_hypotheses(hypotheses, 0.045))
+        self.assertEqual(hypotheses, AxolotlBot.prune_hypotheses(hypotheses, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+import chess
+from reconchess import GameHistory
+from src import AxolotlBot
+from src.opening_book import OpeningBook, OpeningBookWriter, decode_belief, encode_belief
+
+
+class OpeningBookTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        start = {chess.STARTING_FEN: 1.0}
+        other = {"rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/1NBQKBNR w Kkq - 0 1": 0.25, chess.STARTING_FEN: 0.75}
+        writer = OpeningBookWriter()
+        writer.add("sense", start, bytes([chess.B2]))
+        writer.add("filter", start, encode_belief(other), "rnb.pp...")
+        writer.add("move", other, b"0000")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.axob")
+            writer.write(path)
+            book = OpeningBook(path)
+            self.assertEqual(3, len(book))
+            self.assertEqual(bytes([chess.B2]), book.get("sense", start))
+            self.assertEqual(other, decode_belief(book.get("filter", start, "rnb.pp...")))
+            self.assertIsNone(book.get("filter", start, "rnbqpp..."))
+            self.assertEqual(b"0000", book.get("move", dict(reversed(other.items()))))
+            self.assertIsNone(book.get("move", start))
+            book.close()
+
+    def test_fallback(self):
+        writer = OpeningBookWriter()
+        start = {chess.Board().fen(shredder=True): 1.0}
+        writer.add("sense", start, bytes([chess.C3]))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.axob")
+            writer.write(path)
+
+            bot = AxolotlBot()
+            bot.book = OpeningBook(path)
+            bot.handle_game_start(chess.WHITE, chess.Board(), "")
+            self.assertTrue(bot.in_book)
+            self.assertEqual(chess.C3, bot.choose_sense(list(chess.SQUARES), [], 900))
+            bot.handle_sense_result([(square, None) for square in [chess.B2, chess.C2, chess.D2, chess.B3, chess.C3, chess.D3, chess.B4, chess.C4, chess.D4]])
+            self.assertFalse(bot.in_book)
+            self.assertEqual({}, bot.hypotheses)
+            bot.handle_game_end(None, None, GameHistory())
+            bot.book.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import asyncio
+import unittest
+
+import chess
+from reconchess.bots.random_bot import RandomBot
+from src.scripts.local_server import LocalServer
+from src.scripts.play_async import play_remote_games
+
+
+class PlayRemoteGamesTestCase(unittest.TestCase):
+    def test_concurrent_games(self):
+        server = LocalServer(full_turn_limit=10)
+        server.start()
+        game_ids = [server.create_game(chess.WHITE, RandomBot()), server.create_game(chess.BLACK, RandomBot())]
+
+        results = asyncio.run(play_remote_games(server.url, game_ids, ('user', 'password'), [RandomBot(), RandomBot()], status_interval=0.01))
+        server.stop()
+
+        self.assertEqual(2, len(results))
+        for winner_color, win_reason, game_history in results:
+            self.assertIsNotNone(win_reason)
+            self.assertFalse(game_history.is_empty())
+
+
+if __name__ == '__main__':
+    unittest.main()
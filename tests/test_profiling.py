@@ -0,0 +1,66 @@
+import os
+import tempfile
+import time
+import tracemalloc
+import unittest
+
+import src.profiling as profiling
+
+
+@profiling.profile_phase
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+    return seconds
+
+
+class Holder:
+    def __init__(self):
+        self.hypotheses = None
+
+    @profiling.profile_phase
+    def allocate(self, n):
+        self.hypotheses = {str(i): 1 / n for i in range(n)}
+
+
+class ProfilingTestCase(unittest.TestCase):
+    def tearDown(self):
+        profiling.profiler = None
+        profiling.memory_tracker = None
+        tracemalloc.stop()
+
+    def test_disabled(self):
+        self.assertEqual(0.01, busy(0.01))
+
+    def test_modes(self):
+        for mode in ["cprofile", "sample"]:
+            with tempfile.TemporaryDirectory() as directory:
+                profiling.enable(mode, directory)
+                self.assertEqual(0.1, busy(0.1))
+                busy(0.1)
+                profiling.report()
+                with open(os.path.join(directory, "profile.collapsed")) as f:
+                    lines = f.read().splitlines()
+            self.assertTrue(lines)
+            for line in lines:
+                stack, count = line.rsplit(" ", 1)
+                self.assertTrue(stack.startswith("busy;"))
+                self.assertGreater(int(count), 0)
+
+    def test_memory(self):
+        profiling.enable_memory()
+        holder = Holder()
+        holder.allocate(10000)
+        holder.allocate(10)
+        calls, peak, retained, max_retained = profiling.memory_tracker.phases["allocate"]
+        self.assertEqual(2, calls)
+        self.assertGreater(max_retained, 10000 * 50)
+        self.assertGreaterEqual(peak, max_retained)
+        self.assertTrue(profiling.memory_tracker.sites)
+        self.assertAlmostEqual(tracemalloc.get_traced_memory()[0], profiling.current_bytes(), delta=4096)
+        profiling.report()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+import chess
+from src import AxolotlBot
+from src.scripts.synthetic_belief import generate_belief
+from src.shared_belief import BeliefWorkers, SharedBelief
+
+
+class SharedBeliefTestCase(unittest.TestCase):
+    def test_write(self):
+        hypotheses = {chess.STARTING_FEN: 0.25, "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/1NBQKBNR w Kkq - 0 1": 0.75}
+        belief = SharedBelief(4)
+        belief.write(hypotheses)
+        self.assertEqual(list(hypotheses.values()), list(belief.probabilities()))
+        belief.close()
+
+    def test_workers(self):
+        friendly_board, hypotheses = generate_belief(chess.Board(), chess.WHITE, 500, seed=3)
+        workers = BeliefWorkers(2)
+        try:
+            local = AxolotlBot.tally_senses(hypotheses.items())
+            shared = workers.tally_senses(hypotheses)
+            self.assertEqual(local.keys(), shared.keys())
+            for square in local:
+                self.assertEqual(local[square].keys(), shared[square].keys())
+                for result, (p, c) in local[square].items():
+                    self.assertAlmostEqual(p, shared[square][result][0])
+                    self.assertEqual(c, shared[square][result][1])
+
+            result = AxolotlBot.sense_expanded_fen(AxolotlBot.expand_fen(next(iter(hypotheses))), chess.E4)
+            expected = {h: p for h, p in hypotheses.items() if AxolotlBot.sense_expanded_fen(AxolotlBot.expand_fen(h), chess.E4) == result}
+            self.assertEqual(expected, workers.filter(hypotheses, chess.E4, result))
+            # shared memory is written again after filtering
+            self.assertEqual(local.keys(), workers.tally_senses(hypotheses).keys())
+        finally:
+            workers.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
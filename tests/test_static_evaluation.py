@@ -0,0 +1,30 @@
+import unittest
+
+import chess
+from src import AxolotlBot
+from src.static_evaluation import evaluate_boards
+
+
+class StaticEvaluationTestCase(unittest.TestCase):
+    def test_evaluate_boards(self):
+        no_queen = chess.Board("rnb1kbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1")
+        boards = [chess.Board(), no_queen, no_queen.mirror()]
+        scores = evaluate_boards(boards, chess.WHITE)
+        self.assertEqual(0, scores[0])
+        self.assertGreater(scores[1], 800)
+        self.assertEqual(-scores[1], scores[2])
+        self.assertEqual(list(-scores), list(evaluate_boards(boards, chess.BLACK)))
+
+    def test_king_exposure(self):
+        covered, exposed = evaluate_boards([chess.Board("4k3/8/8/8/8/8/3PPP2/4K3 w - - 0 1"),
+                                            chess.Board("4k3/8/8/8/8/3PPP2/8/4K3 w - - 0 1")], chess.WHITE)
+        self.assertGreater(covered, exposed)
+
+    def test_bot(self):
+        bot = AxolotlBot()
+        bot.color = chess.BLACK
+        self.assertEqual([0.5], bot.evaluate_static([chess.Board()]))
+
+
+if __name__ == '__main__':
+    unittest.main()
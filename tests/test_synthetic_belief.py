@@ -0,0 +1,32 @@
+import unittest
+
+import chess
+from src import AxolotlBot
+from src.scripts.synthetic_belief import generate_belief
+
+
+class GenerateBeliefTestCase(unittest.TestCase):
+    def test_basic(self):
+        friendly_board, hypotheses = generate_belief(chess.Board(), chess.WHITE, 1000, seed=1)
+        self.assertEqual(1000, len(hypotheses))
+        self.assertAlmostEqual(1.0, sum(hypotheses.values()))
+        self.assertEqual(hypotheses, generate_belief(chess.Board(), chess.WHITE, 1000, seed=1)[1])
+
+        bot = AxolotlBot()
+        bot.color = chess.WHITE
+        bot.friendly_board = friendly_board
+        bot.hypotheses = hypotheses
+        bot.validate_friendly_pieces()
+        for h in hypotheses:
+            self.assertEqual(chess.WHITE, chess.Board(h).turn)
+
+    def test_black(self):
+        friendly_board, hypotheses = generate_belief(chess.Board(), chess.BLACK, 100, seed=2)
+        self.assertEqual(100, len(hypotheses))
+        self.assertEqual(chess.BLACK, friendly_board.turn)
+        for h in hypotheses:
+            self.assertEqual(chess.BLACK, chess.Board(h).turn)
+
+
+if __name__ == '__main__':
+    unittest.main()